@@ -1,9 +1,16 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .repository import messages
 
 """
 This files generates Hash value of each password for protection of User Data and forward
 back to Authentication File that stores bcrypt password in Database.
 Password again come here to verify the bcrypt password is correct or not.
+Request handlers await the shared executor, which hashes in separate processes with a bounded queue.
 """
 
 pwd_cxt = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -36,3 +43,120 @@ class Hash:
         response: CryptContext Object - Matched Successfully or not
         """
         return pwd_cxt.verify(plain_pwd, hashed_pwd)
+
+
+class HashExecutor:
+    """
+    Runs bcrypt hashing and verification in a process pool, away from event loop and the threadpool serving
+    other endpoints. Calls waiting for a free worker are bounded by max_queue, beyond which requests are shed
+    with 503 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _acquire(self, shed: bool):
+        with self._lock:
+            if shed and self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail=messages.HASHING_BUSY_503, headers={"Retry-After": "1"})
+            self._pending += 1
+
+    def _release(self, failed: bool):
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    async def _run(self, fn, *args, shed=True):
+        self._acquire(shed)
+        failed = True
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+            failed = False
+            return result
+        finally:
+            self._release(failed)
+
+    async def bcrypt(self, password: str):
+        """
+        Parameters
+        ----------------------------------------------------------
+        password: str - User Entered Password
+        ----------------------------------------------------------
+
+        Returns
+        ----------------------------------------------------------
+        response: Hash - Hashed Password
+        """
+        return await self._run(Hash.bcrypt, password)
+
+    async def bcrypt_many(self, passwords):
+        """
+        Hash many passwords for bulk jobs. Passwords are sent in waves of one per worker, so interactive
+        logins wait behind at most one wave, and bulk jobs are never shed.
+        Parameters
+        ----------------------------------------------------------
+        passwords: list - Plain Text Passwords
+        ----------------------------------------------------------
+
+        Returns
+        ----------------------------------------------------------
+        response: list - Hashed Passwords in same order
+        """
+        hashed = []
+        for start in range(0, len(passwords), self.workers):
+            wave = passwords[start:start + self.workers]
+            hashed += await asyncio.gather(*[self._run(Hash.bcrypt, password, shed=False) for password in wave])
+        return hashed
+
+    async def verify(self, hashed_pwd, plain_pwd):
+        """
+        Parameters
+        ----------------------------------------------------------
+        hashed_pwd: str - Hashed Password
+        plain_pwd: str -  Plain Text Password
+        ----------------------------------------------------------
+
+        Returns
+        ----------------------------------------------------------
+        response: bool - Matched Successfully or not
+        """
+        return await self._run(Hash.verify, hashed_pwd, plain_pwd)
+
+    def stats(self):
+        """Return worker count, current queue depth and counters of this process."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': min(self._pending, self.workers),
+                'queued': max(self._pending - self.workers, 0),
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 1))
+executor = HashExecutor(HASH_WORKERS, int(os.environ.get('HASH_QUEUE_LIMIT', HASH_WORKERS * 16)))
@@ -1,8 +1,9 @@
 from fastapi import FastAPI
-from . import models
+from . import models, hashing
 from .database import engine
 from .routers import admin, authentication, users
 from fastapi.staticfiles import StaticFiles
+from .utils.sweeper import sweeper
 
 """
 Creates an Object of FastAPI Instance as app with some Title and Description while viewing in
@@ -55,6 +56,20 @@ app.include_router(authentication.router)
 app.include_router(admin.router)
 app.include_router(users.router)
 
+
+@app.on_event("startup")
+async def start_sweeper():
+    """Start periodic cleanup of expired rows."""
+    sweeper.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop sweeper and hashing worker processes along with application."""
+    await sweeper.stop()
+    hashing.executor.shutdown()
+
+
 """
 Using following we can directly run python file instead of whole uvicorn command.
 Don't use while of production server.
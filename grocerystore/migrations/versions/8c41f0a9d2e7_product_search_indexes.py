@@ -0,0 +1,31 @@
+"""Product Search Indexes
+
+Revision ID: 8c41f0a9d2e7
+Revises: 3b9e1c7d52a4
+Create Date: 2026-10-18 11:02:47.681390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41f0a9d2e7'
+down_revision = '3b9e1c7d52a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_products_price'), 'products', ['price'], unique=False)
+    # Trigram index serves case-insensitive substring search on title, available only in Postgres.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_products_title_trgm', 'products', [sa.text('lower(title) gin_trgm_ops')],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_products_title_trgm', table_name='products')
+    op.drop_index(op.f('ix_products_price'), table_name='products')
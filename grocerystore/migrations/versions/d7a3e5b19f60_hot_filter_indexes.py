@@ -0,0 +1,42 @@
+"""Hot Filter Indexes
+
+Revision ID: d7a3e5b19f60
+Revises: 8c41f0a9d2e7
+Create Date: 2026-10-18 11:48:05.917263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3e5b19f60'
+down_revision = '8c41f0a9d2e7'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns) of every column used in filters of repository and order placing queries.
+INDEXES = [
+    ('ix_my_cart_user_id_product_id', 'my_cart', ['user_id', 'product_id']),
+    ('ix_order_details_user_id_id', 'order_details', ['user_id', 'id']),
+    ('ix_order_details_payment_id', 'order_details', ['payment_id']),
+    ('ix_order_details_description', 'order_details', ['description']),
+    ('ix_order_details_order_status', 'order_details', ['order_status']),
+    ('ix_discount_coupon_coupon_code', 'discount_coupon', ['coupon_code']),
+    ('ix_reset_codes_reset_code', 'reset_codes', ['reset_code']),
+    ('ix_users_shipping_info_user_id', 'users_shipping_info', ['user_id']),
+    ('ix_my_wallet_user_id', 'my_wallet', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction, and does not lock tables against writes.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -1,6 +1,8 @@
 from .database import Base
-from sqlalchemy import String, Integer, Column, Float, Boolean, DateTime, ForeignKey, Date
+from sqlalchemy import String, Integer, Column, Float, Boolean, DateTime, ForeignKey, Date, Index, CheckConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+import datetime
 
 """
 This files stores schemas of tables like tableName, tableColumn, and its Datatype.
@@ -11,14 +13,23 @@ Main file sees into this file first for each non created table to be generated o
 class Product(Base):
     """This table contains elements required to identify different products and its stocks."""
     __tablename__ = "products"
+    __table_args__ = (
+        CheckConstraint('reserved_quantity >= 0', name='ck_products_reserved_quantity'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     image_file = Column(String(255), nullable=True)
-    product_type = Column(String(255), nullable=True)
+    product_type = Column(String(255), nullable=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(String(255), nullable=False, unique=True)
-    price = Column(Float, nullable=False)
+    price = Column(Float, nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
+    reserved_quantity = Column(Integer, nullable=False, default=0, server_default='0')
+
+    @hybrid_property
+    def available(self):
+        """Stock not held by reservations of any cart."""
+        return self.quantity - self.reserved_quantity
 
 
 class User(Base):
@@ -30,6 +41,7 @@ class User(Base):
     email = Column(String(255), nullable=False, unique=True)
     password = Column(String(255), nullable=False)
     is_admin = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default='0')
 
     shipping_info = relationship('ShippingInfo', back_populates="owner")
     my_cart = relationship('MyCart', back_populates="owner")
@@ -37,15 +49,25 @@ class User(Base):
     my_wallet = relationship('MyWallet', back_populates="owner")
 
 
+class RevokedToken(Base):
+    """This table keeps ids of logged out or rotated tokens until those tokens expire."""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(36), nullable=False, unique=True)
+    user_id = Column(Integer, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 class ResetCode(Base):
     """This table provides temporary token to reset user password if they forgot."""
     __tablename__ = "reset_codes"
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), nullable=False, unique=True)
-    reset_code = Column(String(50), nullable=False)
+    reset_code = Column(String(50), nullable=False, index=True)
     status = Column(String(1), default=1)
-    expired_in = Column(DateTime)
+    expired_in = Column(DateTime, index=True)
 
 
 class ShippingInfo(Base):
@@ -58,7 +80,7 @@ class ShippingInfo(Base):
     address = Column(String(255), nullable=False)
     city = Column(String(50), nullable=False)
     state = Column(String(50), nullable=False)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
 
     owner = relationship("User", back_populates="shipping_info")
 
@@ -66,11 +88,15 @@ class ShippingInfo(Base):
 class MyCart(Base):
     """This table has user products info that has been added to cart before payment and shipment"""
     __tablename__ = "my_cart"
+    __table_args__ = (
+        Index('ix_my_cart_user_id_product_id', 'user_id', 'product_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     product_id = Column(Integer, ForeignKey('products.id'))
     product_name = Column(String(255), nullable=False)
+    product_type = Column(String(255), nullable=True)
     product_quantity = Column(Integer, nullable=False)
     product_price = Column(Float, nullable=False)
     total = Column(Float, nullable=True)
@@ -78,20 +104,67 @@ class MyCart(Base):
     owner = relationship("User", back_populates="my_cart")
 
 
+class CheckoutLock(Base):
+    """This table lets one checkout of a user run at a time, row lives while that checkout is in progress."""
+    __tablename__ = "checkout_locks"
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    locked_until = Column(DateTime, nullable=False)
+
+
+class CartSummary(Base):
+    """Keeps item count, line count and subtotal of every users cart per product type."""
+    __tablename__ = "cart_summary"
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    product_type = Column(String(255), primary_key=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    line_count = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0)
+
+
+class StockReservation(Base):
+    """This table holds quantities of products kept aside for users carts until those reservations expire."""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        Index('ix_stock_reservations_user_id_product_id', 'user_id', 'product_id', unique=True),
+        CheckConstraint('quantity > 0', name='ck_stock_reservations_quantity'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class StripeCustomer(Base):
+    """This table keeps Stripe Customer of every user who ordered, so later orders reuse it."""
+    __tablename__ = "stripe_customers"
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    customer_id = Column(String(255), nullable=False, unique=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
 class OrderDetails(Base):
     """This Table has permanent records/ invoice details of user after successful process of payment."""
     __tablename__ = "order_details"
+    __table_args__ = (
+        Index('ix_order_details_user_id_id', 'user_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     shipping_id = Column(Integer, ForeignKey('users_shipping_info.id'))
-    description = Column(String(255), nullable=False)
-    payment_id = Column(String(50), nullable=True)
+    description = Column(String(255), nullable=False, index=True)
+    payment_id = Column(String(50), nullable=True, index=True)
     product_name = Column(String(255), nullable=False)
     total_amount = Column(Float, nullable=False)
     payment_status = Column(String(50), default="pending")
-    order_status = Column(String(50), default="received")
+    order_status = Column(String(50), default="received", index=True)
     coupon_used = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
 
     owner = relationship("User", back_populates="order_details")
 
@@ -101,7 +174,7 @@ class MyWallet(Base):
     __tablename__ = "my_wallet"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     acc_balance = Column(Float, default=0)
 
     owner = relationship("User", back_populates="my_wallet")
@@ -112,7 +185,24 @@ class DiscountCoupon(Base):
     __tablename__ = "discount_coupon"
 
     id = Column(Integer, primary_key=True, index=True)
-    coupon_code = Column(String(20), nullable=False)
+    coupon_code = Column(String(20), nullable=False, index=True)
     discount_percentage = Column(Integer, nullable=False)
     valid_till = Column(Date)
     times_used = Column(Integer, default=0)
+
+
+class CacheVersion(Base):
+    """Keeps Version Counter of cached tables so that every worker can detect changes made by others."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ProductFacet(Base):
+    """Keeps count of Products per product type and price bucket for faceted browsing."""
+    __tablename__ = "product_facets"
+
+    product_type = Column(String(255), primary_key=True)
+    price_bucket = Column(String(20), primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
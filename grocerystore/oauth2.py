@@ -1,6 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from . import tokens
+from sqlalchemy.orm import Session
+from . import tokens, schemas, database
+from .utils.revocation import revoked_tokens
+from .utils.token_cache import token_versions
 
 """
 Following file checks which path requires token Bearer to be generated and throws error code
@@ -10,12 +13,15 @@ for eah not authenticated User.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def get_current_user(data: str = Depends(oauth2_scheme)):
+def get_current_user(data: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     """
-    This function provides email-id to function who has access to routes after successful Login.
+    This function provides email-id to function who has access to routes after successful Login. Tokens
+    issued before the token version of user changed (password reset, role change) are refused.
     Parameters
     ----------------------------------------------------------
     data: str - Oauth2 Session ID
+    db: Database Object - Consulted when revocation filter matches token id and once per
+        TOKEN_VERSION_CHECK_SECONDS per user for token version
     ----------------------------------------------------------
 
     Returns
@@ -28,14 +34,19 @@ def get_current_user(data: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     email_token = tokens.verify_token(data, credentials_exception)
+    if revoked_tokens.is_revoked(db, email_token.jti):
+        raise credentials_exception
+    if token_versions.current(db, email_token.user_id) != email_token.token_version:
+        raise credentials_exception
     return email_token
 
 
-def get_current_user_access_token(data: str = Depends(oauth2_scheme)):
+def get_current_user_access_token(data: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     """
     This function provides email-id to function who has access to routes after successful Login.
     ----------------------------------------------------------
     data: str - Oauth2 Session ID
+    db: Database Object - Consulted only when revocation filter matches token id
     ----------------------------------------------------------
 
     Returns
@@ -48,4 +59,23 @@ def get_current_user_access_token(data: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     email_token = tokens.verify_refresh_token(data, credentials_exception)
+    if revoked_tokens.is_revoked(db, email_token.jti):
+        raise credentials_exception
     return email_token
+
+
+def get_current_principal(token_data: schemas.TokenData = Depends(get_current_user)):
+    """
+    This function provides id, email and admin flag of Logged-In User straight from verified access token
+    claims, without querying users table beyond the cached token version check.
+    Parameters
+    ----------------------------------------------------------
+    token_data: TokenData - Verified access Token data
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: Principal - Current Logged-In User
+    """
+    return schemas.Principal(id=token_data.user_id, email=token_data.email,
+                             is_admin=token_data.role == tokens.ROLE_ADMIN)
@@ -1,70 +1,87 @@
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import asc, desc
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from typing import List
+from dotenv import load_dotenv
 import datetime
-from .. import models, schemas
+import os
+from .. import models, schemas, hashing
 from ..repository import messages
+from ..utils import pagination, cache_version, catalog_cache, token_cache, revocation, product_import, product_patch, etag, order_export, facets, \
+    user_provision
+
+load_dotenv()
 
 """
 This File does all validations related stuff to maintain routers to only route and keep file clean.
 All Database query stuff also takes place here.
 """
 
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+MAX_IMPORT_ERRORS = int(os.environ.get('MAX_IMPORT_ERRORS', 1000))
+PROVISION_CHUNK_SIZE = int(os.environ.get('PROVISION_CHUNK_SIZE', 1000))
+PATCH_BATCH_SIZE = int(os.environ.get('PATCH_BATCH_SIZE', 1000))
+
 
-def is_admin(email: str, db: Session):
+def all_products(db: Session, current_user):
     """
-    Check isAdmin feature so that no user can access admin use cases.
+    Return all products details to verify after adding/updating.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
-    response: bool - Return True in only if admin is Logged-In
+    response: json object - Fetch Data as per Schema-Content
     """
-    check_user = db.query(models.User).filter(models.User.email == email).first()
-    if getattr(check_user, 'email') != 'admin@admin.in':
-        return False
-    return True
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    return db.query(models.Product).order_by(asc(models.Product.id)).all()
 
 
-def all_products(db: Session, email):
+def all_products_page(db: Session, current_user, cursor, size, sort_by, descending):
     """
-    Return all products details to verify after adding/updating.
+    Return one page of products using keyset pagination.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
+    cursor: str - Cursor of the next page returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
-    response: json object - Fetch Data as per Schema-Content
+    response: json object - Fetch one page of Products with next page cursor
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    return db.query(models.Product).order_by(asc(models.Product.id)).all()
+    return pagination.keyset_page(db.query(models.Product), cursor, size, sort_by, descending)
 
 
-def add_product(db: Session, request: List[schemas.ProductBase], email):
+def add_product(db: Session, request: List[schemas.ProductBase], current_user):
     """
     Add products to grocery via requested details.
     Parameters
     ----------------------------------------------------------
     request: Schemas Object - Add multiple Lists of data
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Status of Products added or not
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     for items in request:
@@ -78,11 +95,115 @@ def add_product(db: Session, request: List[schemas.ProductBase], email):
         )
         db.add(new_item)
 
+    facets.apply_changes(db, added=[(items.product_type, items.price) for items in request])
+    cache_version.bump_version(db, cache_version.PRODUCTS)
     db.commit()
+    catalog_cache.catalog.invalidate()
     return messages.json_status_response(200, "Items Added to the Grocery Store")
 
 
-def update_product(item_id: int, db: Session, item: schemas.ProductBase, email):
+async def import_products(stream, file_format: str, on_conflict: str, db: Session, current_user):
+    """
+    Import products streamed as CSV or NDJSON body in batches without loading whole file in memory.
+    Parameters
+    ----------------------------------------------------------
+    stream: async iterator - Request body chunks
+    file_format: str - csv | ndjson
+    on_conflict: str - skip | update products whose description exists already
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Count of inserted and updated products, skipped rows, errors per row up to
+              MAX_IMPORT_ERRORS and count of errors left out beyond that
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+    if file_format not in product_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=messages.INVALID_IMPORT_FORMAT_400)
+    if on_conflict not in product_import.CONFLICT_POLICIES:
+        raise HTTPException(status_code=400, detail=messages.INVALID_CONFLICT_POLICY_400)
+
+    report = {'inserted': 0, 'updated': 0, 'skipped': [], 'errors': [], 'errors_omitted': 0}
+    try:
+        async for batch, errors in product_import.read_batches(stream, file_format, IMPORT_BATCH_SIZE):
+            add_import_errors(report, errors)
+            if batch:
+                await run_in_threadpool(import_products_batch, db, batch, on_conflict, report)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=messages.INVALID_ENCODING_400)
+    finally:
+        if report['inserted'] or report['updated']:
+            await run_in_threadpool(rebuild_facets, db)
+    return report
+
+
+def add_import_errors(report: dict, errors):
+    """Add row errors to import report, errors beyond MAX_IMPORT_ERRORS are only counted."""
+    room = max(MAX_IMPORT_ERRORS - len(report['errors']), 0)
+    report['errors'].extend(errors[:room])
+    report['errors_omitted'] += max(len(errors) - room, 0)
+
+
+def import_products_batch(db: Session, batch, on_conflict: str, report: dict):
+    """
+    Write one batch of imported products in its own transaction and add outcome to report. A batch refused
+    by database is written again row by row, each in a savepoint, so only failing rows are reported.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    batch: list - (row number, row) tuples of validated rows
+    on_conflict: str - skip | update products whose description exists already
+    report: dict - Import report to be updated
+    ----------------------------------------------------------
+    """
+    try:
+        inserted, updated, skipped = product_import.write_batch(db, batch, on_conflict)
+    except DBAPIError:
+        db.rollback()
+        inserted, updated, skipped, errors = 0, 0, [], []
+        for number, row in batch:
+            try:
+                with db.begin_nested():
+                    row_inserted, row_updated, row_skipped = product_import.write_batch(db, [(number, row)],
+                                                                                        on_conflict)
+            except DBAPIError as ex:
+                errors.append({'row': number, 'error': messages.Row_Rejected(ex)})
+                continue
+            inserted += row_inserted
+            updated += row_updated
+            skipped.extend(row_skipped)
+        add_import_errors(report, errors)
+    try:
+        if inserted or updated:
+            cache_version.bump_version(db, cache_version.PRODUCTS)
+        db.commit()
+    except DBAPIError:
+        db.rollback()
+        add_import_errors(report, [{'row': number, 'error': messages.BATCH_CONFLICT} for number, row in batch])
+        return
+    report['inserted'] += inserted
+    report['updated'] += updated
+    report['skipped'].extend(skipped)
+
+
+def rebuild_facets(db: Session):
+    """
+    Recompute facet counts after bulk writes whose previous product type and price are not known.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
+    """
+    facets.rebuild(db)
+    cache_version.bump_version(db, cache_version.PRODUCTS)
+    db.commit()
+    catalog_cache.catalog.invalidate()
+
+
+def update_product(item_id: int, db: Session, item: schemas.ProductBase, current_user):
     """
     Update items and their details as per requirements.
     Parameters
@@ -90,30 +211,30 @@ def update_product(item_id: int, db: Session, item: schemas.ProductBase, email):
     item_id: int - Product Item-ID
     item: schemas Object - Update item desc by item ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch updates made on products
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    check_item_id = db.query(models.Product).filter(models.Product.id == item_id).first()
+    check_item_id = fetch_data(item_id, db)
     if not check_item_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.Product_Not_Found_404(item_id))
 
-    items_found = fetch_data(item_id, db)
-    image_file = getattr(items_found, 'image_file')
-    title = getattr(items_found, 'title')
-    description = getattr(items_found, 'description')
-    price = getattr(items_found, 'price')
-    quantity = getattr(items_found, 'quantity')
+    image_file = getattr(check_item_id, 'image_file')
+    title = getattr(check_item_id, 'title')
+    description = getattr(check_item_id, 'description')
+    price = getattr(check_item_id, 'price')
+    quantity = getattr(check_item_id, 'quantity')
 
     if image_file == item.image_file and title == item.title and description == item.description and price == item.price and quantity == item.quantity:
         raise HTTPException(status_code=302, detail=messages.NO_CHANGES_302)
 
+    facets.apply_changes(db, removed=[(getattr(check_item_id, 'product_type'), price)], added=[(item.product_type, item.price)])
     check_item_id.image_file = item.image_file
     check_item_id.product_type = item.product_type
     check_item_id.title = item.title
@@ -121,70 +242,179 @@ def update_product(item_id: int, db: Session, item: schemas.ProductBase, email):
     check_item_id.price = item.price
     check_item_id.quantity = item.quantity
 
+    cache_version.bump_version(db, cache_version.PRODUCTS)
     db.commit()
+    catalog_cache.catalog.invalidate()
     return messages.json_status_response(200, "Items Updated Successfully.")
 
 
-def delete_product(item_id: int, db: Session, email):
+def update_products(db: Session, request: List[schemas.ProductPatch], current_user):
+    """
+    Partially update many products at once, writing only the fields sent for each product.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    request: Schemas Object - List of product id with changed fields
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Status of every product id: updated | not_found | no_changes | conflict
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    changes = product_patch.merge_patches(request)
+    results = {item_id: 'no_changes' for item_id, fields in changes.items() if not fields}
+    pending = [item_id for item_id, fields in changes.items() if fields]
+
+    any_updated = False
+    for start in range(0, len(pending), PATCH_BATCH_SIZE):
+        batch = pending[start:start + PATCH_BATCH_SIZE]
+        updated = set()
+        try:
+            groups = product_patch.group_by_columns({item_id: changes[item_id] for item_id in batch})
+            for columns, item_ids in groups.items():
+                updated |= product_patch.update_group(db, columns, item_ids, changes)
+            if updated:
+                cache_version.bump_version(db, cache_version.PRODUCTS)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            updated = update_products_one_by_one(db, batch, changes, results)
+        any_updated = any_updated or bool(updated)
+        results.update({item_id: 'updated' if item_id in updated else 'not_found'
+                        for item_id in batch if item_id not in results})
+
+    if any_updated and any('product_type' in fields or 'price' in fields for fields in changes.values()):
+        rebuild_facets(db)
+    elif any_updated:
+        catalog_cache.catalog.invalidate()
+    return [{'id': item_id, 'status': results[item_id]} for item_id in changes]
+
+
+def update_products_one_by_one(db: Session, batch, changes, results):
+    """
+    Retry a batch rejected by database product by product, so that only the conflicting products fail.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    batch: list - Product IDs of the rejected batch
+    changes: dict - Changed fields of every product id
+    results: dict - Status of every product id, conflicts are added here
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: set - Product IDs found and updated
+    """
+    updated = set()
+    for item_id in batch:
+        columns = tuple(field for field in product_patch.PATCH_FIELDS if field in changes[item_id])
+        try:
+            with db.begin_nested():
+                updated |= product_patch.update_group(db, columns, [item_id], changes)
+        except IntegrityError:
+            results[item_id] = 'conflict'
+    if updated:
+        cache_version.bump_version(db, cache_version.PRODUCTS)
+    db.commit()
+    return updated
+
+
+def delete_product(item_id: int, db: Session, current_user):
     """
     Delete products not needed in grocery with help of its id.
     Parameters
     ----------------------------------------------------------
     item_id: int - Product Item-ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Data that deleted
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     delete_item = db.query(models.Product).filter(models.Product.id == item_id).first()
     if not delete_item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.Product_Not_Found_404(item_id))
 
+    facets.apply_changes(db, removed=[(getattr(delete_item, 'product_type'), getattr(delete_item, 'price'))])
+    db.query(models.StockReservation).filter(models.StockReservation.product_id == item_id).delete(
+        synchronize_session=False)
     db.delete(delete_item)
+    cache_version.bump_version(db, cache_version.PRODUCTS)
     db.commit()
+    catalog_cache.catalog.invalidate()
     return messages.json_status_response(200, "Item Deleted from the Grocery Store")
 
 
-def view_orders(db: Session, email):
+def view_orders(db: Session, current_user):
     """
     View All Orders Details of User and status of Orders
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All Data Available in Grocery
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     return db.query(models.OrderDetails).order_by(desc(models.OrderDetails.id)).all()
 
 
-def filter_order_status(request, db: Session, email):
+def export_orders(db: Session, current_user, file_format: str, order_status, user_id, date_from, date_to):
+    """
+    Export orders as CSV or NDJSON, streamed through a server-side cursor.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In Admin Session
+    file_format: str - csv | ndjson
+    order_status: str - Export only orders with this status
+    user_id: int - Export only orders of this user
+    date_from: date - Export orders placed on or after this date
+    date_to: date - Export orders placed on or before this date
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: iterator - Chunks of exported orders
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+    if file_format not in order_export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=messages.INVALID_EXPORT_FORMAT_400)
+
+    query = order_export.orders_query(db, order_status, user_id, date_from, date_to)
+    return order_export.stream_orders(query, file_format)
+
+
+def filter_order_status(request, db: Session, current_user):
     """
     Admin Filters all Order by its status
     Parameters
     ----------------------------------------------------------
     request: schemas Object - Update Order Status of user items
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All Data Available in Grocery
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     filtered_orders = db.query(models.OrderDetails).filter(models.OrderDetails.order_status == request.order_status).all()
@@ -193,21 +423,21 @@ def filter_order_status(request, db: Session, email):
     return filtered_orders
 
 
-def update_order_status(request, db, email):
+def update_order_status(request, db, current_user):
     """
     Admin adds Discount Coupon and its records
     Parameters
     ----------------------------------------------------------
     request: schemas Object - Update Order Status of user items
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Updates Status as per its tracking flow.
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     status_priority = ['received', 'packed', 'shipped', 'delivered', 'returned']
@@ -225,21 +455,21 @@ def update_order_status(request, db, email):
     return messages.json_status_response(200, "Order Status Updated Successfully.")
 
 
-def discount_coupon(db: Session, request: List[schemas.DiscountCoupon], email):
+def discount_coupon(db: Session, request: List[schemas.DiscountCoupon], current_user):
     """
     Add Discount Coupon and its records
     Parameters
     ----------------------------------------------------------
     request: schemas Object - Add multiple Discount coupons'
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of Coupons
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     for coupon in request:
@@ -252,29 +482,172 @@ def discount_coupon(db: Session, request: List[schemas.DiscountCoupon], email):
         )
         db.add(new_coupon)
 
+    cache_version.bump_version(db, cache_version.COUPONS)
     db.commit()
+    cache_version.version_tracker.expire(cache_version.COUPONS)
     return messages.json_status_response(200, "Coupons Added Successfully")
 
 
-def show_discount_coupon(db: Session, email):
+def show_discount_coupon(db: Session, current_user, request, response):
     """
-    Return all discount coupon details.
+    Return all discount coupon details, or 304 if client has the latest version already.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In Admin Session
+    current_user: Principal - Current Logged-In Admin Session
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Data of all applicable coupons
     """
-    if not is_admin(email, db):
+    if not current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
+    not_modified = etag.conditional_response(request, response, db, cache_version.COUPONS)
+    if not_modified:
+        return not_modified
     return db.query(models.DiscountCoupon).all()
 
 
+async def provision_users(request: List[schemas.User], db: Session, current_user):
+    """
+    Register many users at once. Passwords are hashed in parallel on hashing executor and every chunk of
+    users is inserted along with wallets in one transaction.
+    Parameters
+    ----------------------------------------------------------
+    request: Schemas Object - List of users to register
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Outcome of every row: created | exists | duplicate | invalid | conflict
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    valid, results = user_provision.validate_users(request)
+    for start in range(0, len(valid), PROVISION_CHUNK_SIZE):
+        chunk = valid[start:start + PROVISION_CHUNK_SIZE]
+        existing = await run_in_threadpool(user_provision.existing_emails, db, [user.email for number, user in chunk])
+        for number, user in chunk:
+            if user.email in existing:
+                results[number] = {'row': number, 'email': user.email, 'status': 'exists'}
+        chunk = [(number, user) for number, user in chunk if user.email not in existing]
+        if not chunk:
+            continue
+
+        passwords = await hashing.executor.bcrypt_many([user.password for number, user in chunk])
+        created = await run_in_threadpool(provision_chunk, db, [user for number, user in chunk], passwords)
+        for number, user in chunk:
+            results[number] = {'row': number, 'email': user.email, 'status': 'created'} if created else \
+                {'row': number, 'email': user.email, 'status': 'conflict', 'error': messages.BATCH_CONFLICT}
+    return [results[number] for number in range(len(request))]
+
+
+def provision_chunk(db: Session, users, passwords):
+    """Insert one chunk of users with wallets and commit. Returns False if database rejected the chunk."""
+    try:
+        user_provision.insert_users(db, list(zip(users, passwords)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def promote_user(user_id: int, db: Session, current_user):
+    """
+    Grant admin role to a User. Token version is bumped so that refresh tokens issued with old role stop
+    working and user logs in again to receive admin claims.
+    Parameters
+    ----------------------------------------------------------
+    user_id: int - ID of User to promote
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Promotion Status
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.USER_NOT_FOUND)
+    if user.is_admin:
+        raise HTTPException(status_code=302, detail=messages.NO_CHANGES_302)
+
+    user.is_admin = True
+    user.token_version = user.token_version + 1
+    db.commit()
+    token_cache.token_versions.forget(user_id)
+    return messages.json_status_response(200, "User Promoted to Admin Successfully.")
+
+
+def cache_stats(db: Session, current_user):
+    """
+    Return hit/miss counters of product catalog and verified token caches of this worker.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Catalog and Verified Token Cache counters
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    return {'catalog': catalog_cache.catalog.stats(), 'tokens': token_cache.verified_tokens.stats(),
+            'revoked_tokens': revocation.revoked_tokens.stats()}
+
+
+def flush_token_cache(current_user):
+    """
+    Forget verified tokens cached by this worker, so every token is verified again with current secret keys.
+    Parameters
+    ----------------------------------------------------------
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Flush Status
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    token_cache.verified_tokens.flush()
+    return messages.json_status_response(200, "Token Cache Flushed Successfully.")
+
+
+def hashing_stats(current_user):
+    """
+    Return queue depth and counters of password hashing executor of this worker.
+    Parameters
+    ----------------------------------------------------------
+    current_user: Principal - Current Logged-In Admin Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Hashing Executor metrics
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    return hashing.executor.stats()
+
+
 def fetch_data(item_id: int, db: Session):
     """
     Common function to fetch data of products for other functions above.
@@ -1,21 +1,31 @@
 import datetime
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+import os
 import re
 import uuid
 from ..repository import emailUtil, messages, emailFormat
-from .. import models, tokens
-from ..hashing import Hash
+from .. import models, tokens, hashing
+from ..utils.revocation import revoked_tokens
+from ..utils.token_cache import token_versions
 
 """
 This File does all validations related stuff for Login, Register, & Forgot Password.
 All Database query stuff also takes place here.
 """
 
+ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@admin.in')
+EMAIL_PATTERN = r"^[a-z\d]+[\._]?[a-z\d]+[@]\w+[.]\w{2,3}$"
+RESET_CODE_TTL_MINUTES = int(os.environ.get('RESET_CODE_TTL_MINUTES', 30))
+PASSWORD_PATTERN = r'^.*(?=.{8,})(?=.*\d)(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=]).*$'
 
-def register(request, db: Session):
+
+async def register(request, db: Session):
     """
     Function provides validation and authentication before registering for endpoint.
+    Password is hashed on hashing executor, database work runs in threadpool.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
@@ -26,20 +36,32 @@ def register(request, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Registered Data of the user
     """
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    await run_in_threadpool(validate_registration, request, db)
+    password = await hashing.executor.bcrypt(request.password)
+    await run_in_threadpool(create_user, request, password, db)
+    return messages.json_status_response(200, "User Registered Successfully")
+
+
+def validate_registration(request, db: Session):
+    """Raise if email is taken or email/password does not match the required format."""
+    user = db.query(models.User.id).filter(models.User.email == request.email).first()
     if user:
         raise HTTPException(status_code=409, detail=messages.Email_exists_409(request.email))
-    if not re.fullmatch(r"^[a-z\d]+[\._]?[a-z\d]+[@]\w+[.]\w{2,3}$", request.email):
+    if not re.fullmatch(EMAIL_PATTERN, request.email):
         raise HTTPException(status_code=401, detail=messages.INVALID_EMAIL_401)
     if request.password != request.confirm_password:
         raise HTTPException(status_code=401, detail=messages.PASSWORD_MISMATCH_401)
-    if not re.fullmatch(r'^.*(?=.{8,})(?=.*\d)(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=]).*$', request.password):
+    if not re.fullmatch(PASSWORD_PATTERN, request.password):
         raise HTTPException(status_code=401, detail=messages.PASSWORD_FORMAT_401)
 
+
+def create_user(request, password: str, db: Session):
+    """Insert User with already hashed password along with its Wallet."""
     new_user = models.User(
         username=request.username,
         email=request.email,
-        password=Hash.bcrypt(request.password)
+        password=password,
+        is_admin=request.email == ADMIN_EMAIL
     )
     db.add(new_user)
     db.commit()
@@ -51,10 +73,8 @@ def register(request, db: Session):
     db.commit()
     db.refresh(user_wallet)
 
-    return messages.json_status_response(200, "User Registered Successfully")
 
-
-def login(request, db: Session):
+async def login(request, db: Session):
     """
     Check Validation and password along with token to let access to other endpoints.
     Parameters
@@ -67,71 +87,127 @@ def login(request, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Access and Refresh Tokens
     """
-    user = db.query(models.User).filter(models.User.email == request.username).first()
+    user = await run_in_threadpool(db.query(models.User).filter(models.User.email == request.username).first)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.INCORRECT_CREDENTIALS_404)
-    if not Hash.verify(user.password, request.password):
+    if not await hashing.executor.verify(user.password, request.password):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.INCORRECT_PASSWORD_404)
 
-    access_token = tokens.create_access_token(data={"sub": user.email})
-    refresh_token = tokens.create_refresh_token(data={"sub": user.email})
+    claims = tokens.user_claims(user)
+    access_token = tokens.create_access_token(data=claims)
+    refresh_token = tokens.create_refresh_token(data=claims)
     return {"access_token": access_token,
             "refresh_token": refresh_token,
             "token_type": "bearer"}
 
 
-def new_access_token(email):
+def new_access_token(token_data, db: Session):
     """
-    Create New Access Token from Refresh Token and replace with Access Token
+    Create New Access Token from Refresh Token and replace with Access Token. Refresh Token is rotated, the
+    one presented gets revoked and a new one is returned along with access token. Refresh is the only point
+    where token claims are checked against database, so role changes and password resets reach the new token.
     Parameters
     ----------------------------------------------------------
-    email: str - Current Logged-In User Session
+    token_data: TokenData - Claims of verified Refresh Token
+    db: Database Object - Fetching Schemas Content
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
-    response: json object - Generates new access token from refresh token
+    response: json object - Generates new access token and refresh token from refresh token
     """
-    access_token = tokens.create_access_token(data={"sub": email})
-    return {'new_access_token': access_token}
+    user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
+    if not user or user.token_version != token_data.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.TOKEN_EXPIRED_401,
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    try:
+        revoked_tokens.revoke(db, token_data)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.TOKEN_EXPIRED_401,
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    claims = tokens.user_claims(user)
+    return {'new_access_token': tokens.create_access_token(data=claims),
+            'refresh_token': tokens.create_refresh_token(data=claims)}
+
 
+def logout(token_data, request, db: Session):
+    """
+    Revoke access token of current session, and refresh token too if sent along.
+    Parameters
+    ----------------------------------------------------------
+    token_data: TokenData - Claims of verified Access Token
+    request: Schemas Object - Optional Refresh Token to revoke
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
 
-def forgot_password(request, db: Session):
+    Returns
+    ----------------------------------------------------------
+    response: json object - Logout Status
+    """
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                          detail=messages.TOKEN_EXPIRED_401, headers={"WWW-Authenticate": "Bearer"})
+    try:
+        revoked_tokens.revoke(db, token_data)
+        if request and request.refresh_token:
+            refresh_data = tokens.verify_refresh_token(request.refresh_token, credentials_exception)
+            if refresh_data.user_id != token_data.user_id:
+                raise credentials_exception
+            if not revoked_tokens.is_revoked(db, refresh_data.jti):
+                revoked_tokens.revoke(db, refresh_data)
+        db.commit()
+    except IntegrityError:
+        """Same token logged out by another request meanwhile"""
+        db.rollback()
+        raise credentials_exception
+    return messages.json_status_response(200, "Logged Out Successfully.")
+
+
+def forgot_password(request, db: Session, background_tasks):
     """
     Function request email of user to provide token for reset password access link.
+    Reset code is valid for RESET_CODE_TTL_MINUTES, an expired code gets replaced by a new one.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
     request: Schemas Object - Contains data to fetch email
+    background_tasks: BackgroundTasks - Send Email after response is returned
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Receive Email Message status/Confirmation
     """
-    user = db.query(models.User).filter(models.User.email == request.email).first()
-    existing_user = db.query(models.ResetCode).filter(models.ResetCode.email == request.email).first()
+    user = db.query(models.User.id).filter(models.User.email == request.email).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.USER_NOT_FOUND)
-    if existing_user:
+    now = datetime.datetime.utcnow()
+    existing_code = db.query(models.ResetCode).filter(models.ResetCode.email == request.email).first()
+    if existing_code and existing_code.expired_in and existing_code.expired_in > now:
         raise HTTPException(status_code=409, detail=messages.TOKEN_SENT)
 
     """Create Reset Token and save in Database"""
     reset_code = str(uuid.uuid1())
-    new_code = models.ResetCode(email=request.email, reset_code=reset_code, expired_in=datetime.datetime.now())
-    db.add(new_code)
+    expired_in = now + datetime.timedelta(minutes=RESET_CODE_TTL_MINUTES)
+    if existing_code:
+        existing_code.reset_code = reset_code
+        existing_code.expired_in = expired_in
+    else:
+        db.add(models.ResetCode(email=request.email, reset_code=reset_code, expired_in=expired_in))
     db.commit()
-    db.refresh(new_code)
 
     """Formatting Email"""
     subject, recipient, message = emailFormat.forgotPasswordFormat(request.email, reset_code)
 
     """Sending Email to User"""
-    emailUtil.send_email(subject, recipient, message)
+    background_tasks.add_task(emailUtil.send_email, subject, recipient, message)
     return messages.json_status_response(200, "We have send an Email, to reset your Password.")
 
 
-def reset_password(reset_token, request, db: Session):
+async def reset_password(reset_token, request, db: Session):
     """
     Request for new token and new password validations before reset the old password with new.
     Parameters
@@ -145,21 +221,31 @@ def reset_password(reset_token, request, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch data for Password Update Confirmation
     """
-    user = db.query(models.ResetCode).filter(models.ResetCode.reset_code == reset_token).first()
+    user = await run_in_threadpool(
+        db.query(models.ResetCode).filter(models.ResetCode.reset_code == reset_token).first)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.INCORRECT_TOKEN_404)
+    if not user.expired_in or user.expired_in <= datetime.datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.RESET_CODE_EXPIRED_404)
     if request.password != request.confirm_password:
         raise HTTPException(status_code=401, detail=messages.PASSWORD_MISMATCH_401)
-    if not re.fullmatch(r'^.*(?=.{8,})(?=.*\d)(?=.*[a-z])(?=.*[A-Z])(?=.*[@#$%^&+=]).*$', request.password):
+    if not re.fullmatch(PASSWORD_PATTERN, request.password):
         raise HTTPException(status_code=401, detail=messages.PASSWORD_FORMAT_401)
 
-    email = getattr(user, 'email')
+    password = await hashing.executor.bcrypt(request.password)
+    await run_in_threadpool(update_password, getattr(user, 'email'), password, db)
+    return messages.json_status_response(200, "Your Password has been Successfully Reset.")
 
+
+def update_password(email: str, password: str, db: Session):
+    """Store already hashed password, invalidate issued tokens and remove used reset code."""
     check_user = db.query(models.User).filter(models.User.email == email).first()
-    check_user.password = Hash.bcrypt(request.password)
+    check_user.password = password
+    check_user.token_version = check_user.token_version + 1
+    user_id = check_user.id
 
     delete_token = db.query(models.ResetCode).filter(models.ResetCode.email == email).first()
     db.delete(delete_token)
 
     db.commit()
-    return messages.json_status_response(200, "Your Password has been Successfully Reset.")
+    token_versions.forget(user_id)
@@ -18,13 +18,30 @@ PASSWORD_FORMAT_401 = "status_code: 401 - Password Must be 8 characters Long Pas
 INCORRECT_CREDENTIALS_404 = "status_code: 404 - Invalid Credentials"
 ORDER_PRIORITY_401 = "status_code: 401 - Please maintain Order Status Priority!"
 INCORRECT_PASSWORD_404 = "status_code: 404 - Incorrect Password"
+RESET_CODE_EXPIRED_404 = "status_code: 404 - Reset Token is Expired! Please request a new one."
 INCORRECT_TOKEN_404 = "status_code: 404 - Incorrect Token! Please Provide Correct Token."
 CART_EMPTY_404 = "status_code: 404 - No Items found in your Cart. Please add items to your Cart."
 SHIPPING_UNAVAILABLE_404 = "status_code: 404 - Please Provide Your Shipping Info. And proceed with Payment"
 USER_NOT_FOUND = "status_code: 404 - User Not Found"
 RECORD_NOT_FOUND = "status_code: 404 - No Records Found!!!"
+TOKEN_EXPIRED_401 = "status_code: 401 - Session is no longer valid! Please Login again."
 TOKEN_SENT = "status_code: 401 - Reset Token Already Sent!"
+HASHING_BUSY_503 = "status_code: 503 - Too many Login Requests right now! Please Try again in a moment."
+INVALID_QUANTITY_400 = "status_code: 400 - Item Quantity must be at least 1."
+CHECKOUT_IN_PROGRESS_409 = "status_code: 409 - Another Checkout of your Cart is in progress! Please wait for it to finish."
+CART_CHANGED_409 = "status_code: 409 - Your Cart changed during Checkout! Please review your Cart and Checkout again."
+PAYMENT_GATEWAY_502 = "status_code: 502 - Payment Gateway is not responding! Please Try again in a moment."
 OUT_OF_STOCK = "status_code: 404 - Out of Stock"
+INVALID_CURSOR_400 = "status_code: 400 - Invalid Cursor! Please use the cursor returned with previous page."
+INVALID_OFFSET_400 = "status_code: 400 - Offset can not be Negative."
+INVALID_IMPORT_FORMAT_400 = "status_code: 400 - Invalid Import Format! Supported formats are csv and ndjson."
+INVALID_EXPORT_FORMAT_400 = "status_code: 400 - Invalid Export Format! Supported formats are csv and ndjson."
+INVALID_CONFLICT_POLICY_400 = "status_code: 400 - Invalid Conflict Policy! Please use skip or update."
+INVALID_ENCODING_400 = "status_code: 400 - Request Body must be UTF-8 encoded."
+INVALID_JSON_ROW = "Row is not a valid JSON object."
+BATCH_CONFLICT = "Batch rejected by database, please retry these rows."
+INVALID_PRODUCT_IDS_400 = "status_code: 400 - Product IDs must be comma separated numbers."
+INVALID_SORT_KEY_400 = "status_code: 400 - Invalid Sort Key! Products can be sorted by id, price or title."
 
 
 def Product_Not_Found_404(msg):
@@ -72,6 +89,113 @@ def Stock_Unavailable_404(quantity):
     return f"status_code: 404 - Stock UnAvailable! {quantity} Stocks left."
 
 
+def Insufficient_Stock_409(product_names):
+    """
+    Stock left is less than quantity ordered at checkout.
+    Parameters
+    ----------------------------------------------------------
+    product_names: list - Names of products short of stock
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"status_code: 409 - Not enough stock left for {', '.join(product_names)}. Please update your Cart."
+
+
+def Invalid_Page_Size_400(max_size):
+    """
+    Page Size requested is out of allowed range.
+    Parameters
+    ----------------------------------------------------------
+    max_size: int - Maximum items allowed in one page
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"status_code: 400 - Page Size must be between 1 and {max_size}."
+
+
+def Missing_Fields(fields):
+    """
+    Required fields are missing in imported row.
+    Parameters
+    ----------------------------------------------------------
+    fields: list - Names of missing fields
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"Missing required fields: {', '.join(fields)}."
+
+
+def Csv_Columns_Mismatch(expected, found):
+    """
+    CSV row has different number of columns than the header.
+    Parameters
+    ----------------------------------------------------------
+    expected: int - Columns in header row
+    found: int - Columns in current row
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"Expected {expected} columns as per header, found {found}."
+
+
+def Row_Rejected(error):
+    """
+    Database refused to write imported row.
+    Parameters
+    ----------------------------------------------------------
+    error: DBAPIError - Error raised by database for the row
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    reason = str(getattr(error, 'orig', error)).strip().splitlines()
+    return f"Row rejected by database: {reason[0] if reason else type(error).__name__}."
+
+
+def Invalid_Price_Bucket_400(buckets):
+    """
+    Price Bucket requested does not exist.
+    Parameters
+    ----------------------------------------------------------
+    buckets: list - Labels of available price buckets
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"status_code: 400 - Invalid Price Bucket! Available buckets are {', '.join(buckets)}."
+
+
+def Too_Many_Ids_400(max_ids):
+    """
+    More Product IDs requested than allowed in one lookup.
+    Parameters
+    ----------------------------------------------------------
+    max_ids: int - Maximum IDs allowed in one request
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Message status
+    """
+    return f"status_code: 400 - At most {max_ids} Product IDs can be requested at once."
+
+
 def json_status_response(status_code, msg):
     return {
         'status_code': status_code,
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import and_, desc, asc
 from dotenv import load_dotenv
-from .. import models
-from ..repository import admin, messages, emailFormat, emailUtil
-from ..utils import stripe_gateway, order_placing_query
+from .. import models, schemas
+from ..repository import messages, emailFormat, emailUtil
+from ..utils import stripe_gateway, order_placing_query, pagination, catalog_cache, product_search, etag, cache_version, facets, \
+    cart_store, reservations
 
 load_dotenv()
 
@@ -13,6 +15,24 @@ This File does all validations related stuff for users Add | View | Order | Invo
 All Database query stuff also takes place here.
 """
 
+MAX_LOOKUP_IDS = 100
+MAX_CART_BATCH = 200
+
+
+def product_list(rows):
+    """
+    Convert Product rows to schema objects, so they can be kept in catalog cache after session is closed.
+    Parameters
+    ----------------------------------------------------------
+    rows: list - Product rows fetched from database
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: list - Products as per Schema-Content
+    """
+    return [schemas.Product.from_orm(row) for row in rows]
+
 
 def view_products(db: Session):
     """
@@ -26,7 +46,98 @@ def view_products(db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Data of all Products available in Grocery.
     """
-    return db.query(models.Product).order_by(asc(models.Product.id)).all()
+    return catalog_cache.catalog.get_or_load(db, ('view_products',), lambda: product_list(
+        db.query(models.Product).order_by(asc(models.Product.id)).all()))
+
+
+def view_products_page(db: Session, cursor, size, sort_by, descending):
+    """
+    Return one page of products using keyset pagination instead of loading whole grocery.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    cursor: str - Cursor of the next page returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch one page of Products with next page cursor.
+    """
+    def load_page():
+        page = pagination.keyset_page(db.query(models.Product), cursor, size, sort_by, descending)
+        page['items'] = product_list(page['items'])
+        return page
+
+    return catalog_cache.catalog.get_or_load(db, ('view_products_page', cursor, size, sort_by, descending), load_page)
+
+
+def browse_products(db: Session, product_types, price_buckets, cursor, size, sort_by, descending):
+    """
+    Return one page of products of selected product types and price buckets, with facet counts.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    product_types: list - Product types to filter, all when empty
+    price_buckets: list - Price buckets to filter, all when empty
+    cursor: str - Cursor of the next page returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch one page of Products with next page cursor and facet counts.
+    """
+    product_types = sorted(set(product_types or []))
+    price_buckets = sorted(set(price_buckets or []))
+
+    def load_page():
+        query = db.query(models.Product)
+        if product_types:
+            query = query.filter(models.Product.product_type.in_(product_types))
+        if price_buckets:
+            query = query.filter(facets.bucket_filter(price_buckets))
+        page = pagination.keyset_page(query, cursor, size, sort_by, descending)
+        page['items'] = product_list(page['items'])
+        page['facets'] = facets.facet_counts(db, product_types, price_buckets)
+        return page
+
+    key = ('browse_products', tuple(product_types), tuple(price_buckets), cursor, size, sort_by, descending)
+    return catalog_cache.catalog.get_or_load(db, key, load_page)
+
+
+def products_by_ids(ids: str, db: Session):
+    """
+    Return products of the requested ids in request order from id index of cached catalog, or with one query
+    when catalog is not cached. Id sets are never cached on their own, they would push catalog pages out.
+    Parameters
+    ----------------------------------------------------------
+    ids: str - Comma separated Product IDs
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch Data of requested Products, unknown ids are left out.
+    """
+    try:
+        item_ids = list(dict.fromkeys(int(item_id) for item_id in ids.split(',') if item_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=messages.INVALID_PRODUCT_IDS_400)
+    if len(item_ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=messages.Too_Many_Ids_400(MAX_LOOKUP_IDS))
+    if not item_ids:
+        return []
+
+    found = catalog_cache.catalog.get_index(db, ('view_products',))
+    if found is None:
+        found = {product.id: product for product in product_list(
+            db.query(models.Product).filter(models.Product.id.in_(item_ids)).all())}
+    return [found[item_id] for item_id in item_ids if item_id in found]
 
 
 def search_by_name(name: str, db: Session):
@@ -42,8 +153,8 @@ def search_by_name(name: str, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Data of all Products with similar names in Product title
     """
-    return db.query(models.Product).filter(models.Product.title.like(name+'%')).order_by(
-        asc(models.Product.id)).all()
+    return catalog_cache.catalog.get_or_load(db, ('search_by_name', name), lambda: product_list(
+        db.query(models.Product).filter(models.Product.title.like(name+'%')).order_by(asc(models.Product.id)).all()))
 
 
 def search_by_price(max_price: float, min_price: float, db: Session):
@@ -60,8 +171,9 @@ def search_by_price(max_price: float, min_price: float, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Data of all Products between the price tag filter
     """
-    return db.query(models.Product).filter(models.Product.price > min_price, models.Product.price < max_price).order_by(
-        asc(models.Product.id)).all()
+    return catalog_cache.catalog.get_or_load(db, ('search_by_price', max_price, min_price), lambda: product_list(
+        db.query(models.Product).filter(models.Product.price > min_price, models.Product.price < max_price).order_by(
+            asc(models.Product.id)).all()))
 
 
 def search_by_name_and_price(request, db: Session):
@@ -77,127 +189,149 @@ def search_by_name_and_price(request, db: Session):
     ----------------------------------------------------------
     response: json object - Fetch Data of all Products after filtering
     """
-    name_and_price = db.query(models.Product).filter(and_(
-        and_(models.Product.price > request.min_price, models.Product.price < request.max_price),
-        (models.Product.title.like(request.item_name+'%')))).order_by(asc(models.Product.id)).all()
+    key = ('search_by_name_and_price', request.item_name, request.max_price, request.min_price, request.limit,
+           request.offset)
+    name_and_price = catalog_cache.catalog.get_or_load(db, key, lambda: product_list(
+        product_search.search_products(db, request.item_name, request.min_price, request.max_price, request.limit,
+                                       request.offset)))
     if not name_and_price:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
     return name_and_price
 
 
-def add_to_cart(request, db: Session, email):
+def add_to_cart(request, db: Session, current_user):
     """
     Function provides validations to add product to cart and increase or decrease items quantity
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
     request: Schemas Object - Contains data to find products to add to cart.
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Data Confirmation of products added
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-    product_id = db.query(models.Product).filter(models.Product.id == request.item_id).first()
-
-    """Check Product Exists or Not"""
-    if not product_id:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.Product_Not_Found_404(request.item_id))
-
-    stock_id = getattr(product_id, "id")
-    stock_quantity = getattr(product_id, "quantity")
-    stock_title = getattr(product_id, "title")
-    stock_price = getattr(product_id, "price")
-
-    """Check Product Availability."""
-    if request.item_quantity > getattr(product_id, "quantity"):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.Stock_Unavailable_404(stock_quantity))
-
-    """Check Product Already Exists in Cart or not"""
-    my_products = db.query(models.MyCart).filter(models.MyCart.user_id == user_id[0]).all()
-    for i in my_products:
-        total_product_quantity = (getattr(i, "product_quantity") + request.item_quantity)
-        if request.item_id == getattr(i, "product_id"):
-            if total_product_quantity > getattr(product_id, "quantity"):
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.OUT_OF_STOCK)
-            else:
-                i.product_quantity = (getattr(i, "product_quantity") + request.item_quantity)
-                i.total = (getattr(i, "total") + (stock_price*request.item_quantity))
-                db.commit()
-                return {"Status": "Item Updated Successfully..."}
-
-    """Add Product Details to MyCart."""
-    cart_item = models.MyCart(
-        user_id=user_id[0],
-        product_id=stock_id,
-        product_name=stock_title,
-        product_quantity=request.item_quantity,
-        product_price=stock_price,
-        total=stock_price*request.item_quantity
-    )
-    db.add(cart_item)
-    db.commit()
-    db.refresh(cart_item)
+    if request.item_quantity < 1:
+        raise HTTPException(status_code=400, detail=messages.INVALID_QUANTITY_400)
+
+    """Add Product to Cart, or increase its quantity if it is in Cart already, as long as stock lasts."""
+    updated = cart_store.carts.add(db, current_user.id, request.item_id, request.item_quantity)
+    cart_store.carts.commit(db)
+    if updated:
+        return {"Status": "Item Updated Successfully..."}
     return messages.json_status_response(200, "Items Successfully Added to Cart")
 
 
-def my_cart(db: Session, email):
+def add_many_to_cart(request, db: Session, current_user):
+    """
+    Add a whole shopping list to cart. Stock of all items is checked with one read and all cart changes are
+    written in one transaction, items that can not be added are reported instead of failing the list.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    request: Schemas Object - List of products and quantities to add to cart
+    current_user: Principal - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Status of every item: added | updated | not_found | stock_unavailable |
+              out_of_stock | invalid_quantity
+    """
+    if current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    items, invalid = {}, set()
+    for item in request:
+        items[item.item_id] = items.get(item.item_id, 0) + item.item_quantity
+        if item.item_quantity < 1:
+            invalid.add(item.item_id)
+    """A negative line can not take back quantity of another line of the same item"""
+    items.update({item_id: 0 for item_id in invalid})
+    if len(items) > MAX_CART_BATCH:
+        raise HTTPException(status_code=400, detail=messages.Too_Many_Ids_400(MAX_CART_BATCH))
+    if not items:
+        return []
+
+    results = cart_store.carts.add_many(db, current_user.id, items)
+    cart_store.carts.commit(db)
+    return [{'item_id': item_id, 'status': results[item_id]} for item_id in items]
+
+
+def my_cart(db: Session, current_user):
     """
     Functions returns products selected by user.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All data available in Users-Cart
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-    my_products = db.query(models.MyCart).filter(models.MyCart.user_id == user_id[0]).all()
+    my_products = cart_store.carts.items(db, current_user.id)
 
     if not my_products:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
     return my_products
 
 
-def add_shipping_info(request, db: Session, email):
+def cart_summary(db: Session, current_user):
+    """
+    Functions returns item count, line count and subtotals of cart without reading cart lines.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Cart Summary of User
+    """
+    if current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    return cart_store.carts.summary(db, current_user.id)
+
+
+def add_shipping_info(request, db: Session, current_user):
     """
     Functions add shipping info/ address info of user to shipping table.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
     request: Schemas Object - Contains Shipping Info to be added
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of Address added
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     if len(request.phone_no) != 10:
         raise HTTPException(status_code=401, detail=messages.INVALID_PHONE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
     new_address = models.ShippingInfo(
         name=request.name,
         phone_no=request.phone_no,
         address=request.address,
         city=request.city,
         state=request.state,
-        user_id=user_id[0]
+        user_id=current_user.id
     )
     db.add(new_address)
     db.commit()
@@ -205,104 +339,118 @@ def add_shipping_info(request, db: Session, email):
     return messages.json_status_response(200, "New Shipping Address Added Successfully.")
 
 
-def show_shipping_info(db, email):
+def show_shipping_info(db, current_user):
     """
     Let user view their shipment info (as there are multiple).
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All data/addresses of User
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    shipping_address = db.query(models.ShippingInfo).filter(and_(models.User.email == email, models.User.id == models.ShippingInfo.user_id)).all()
+    shipping_address = db.query(models.ShippingInfo).filter(models.ShippingInfo.user_id == current_user.id).all()
 
     if not shipping_address:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
     return shipping_address
 
 
-def delete_item_from_cart(item_id: int, db: Session, email):
+def delete_item_from_cart(item_id: int, db: Session, current_user):
     """
     Function helps user to remove items from cart before payout.
     Parameters
     ----------------------------------------------------------
     item_id: int - Product item-ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of Product removed from cart
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-    delete_item = db.query(models.MyCart).filter(and_(models.MyCart.user_id == user_id[0]), models.MyCart.product_id == item_id).first()
-    if not delete_item:
+    if not cart_store.carts.remove(db, current_user.id, item_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.RECORD_NOT_FOUND)
-
-    db.delete(delete_item)
-    db.commit()
+    cart_store.carts.commit(db)
     return messages.json_status_response(200, "Item Deleted Successfully!")
 
 
-def order_payment(request, db, email, background_tasks):
+def prepare_order(request, db, current_user):
     """
-    Payment gateway for pay for products owned.
+    Validate cart, shipping information and coupon code and work out amount payable, before payment is asked.
+    Checkout of User is claimed here, so a second checkout started meanwhile is refused until this one ends.
+    Transaction is committed afterwards so no connection or row lock is held while payment gateway responds.
     Parameters
     ----------------------------------------------------------
     request: Schemas Object - Contains data about discount coupon
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
-    background_tasks: BackgroundTasks - Complete Task in Background
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
-    response: json object - Fetch status of Email-Confirmation of order placed
+    response: tuple - Cart lines, shipping information, coupon discount, coupon used, amount payable and
+    Stripe Customer id kept for User
     """
 
-    if admin.is_admin(email, db):
-        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
-
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-
     """Check User has Items in their Cart before Proceed."""
-    check_cart_existence = order_placing_query.check_cart(db, user_id)
+    check_cart_existence = order_placing_query.check_cart(cart_store.carts.items(db, current_user.id))
 
     """Check User has added their Shipping Information."""
-    shipping_info = order_placing_query.shipment_info(request, db, user_id)
+    shipping_info = order_placing_query.shipment_info(request, db, current_user.id)
 
     """Fetch the Coupon Code and verify"""
-    coupon_discount, coupon_using = order_placing_query.coupon_code_validation(db, user_id, request)
+    coupon_discount, coupon_using = order_placing_query.coupon_code_validation(db, current_user.id, request)
 
     """Fetch the Total Amount Payable By User"""
-    total_amount = order_placing_query.order_amount(request, db, user_id, coupon_discount)
+    total_amount = order_placing_query.order_amount(request, cart_store.carts.summary(db, current_user.id),
+                                                    coupon_discount)
+    customer_id = stripe_gateway.stored_customer(db, current_user.id)
+
+    order_placing_query.claim_checkout(db, current_user.id)
+    db.commit()
+    return check_cart_existence, shipping_info, coupon_discount, coupon_using, total_amount, customer_id
+
 
+def place_order(db, current_user, order, invoice):
     """
-    Generate Invoice for User Orders
-    Using Stripe Payment Gateway
+    Write order rows paid with invoice, decrease stock, empty cart and end checkout of User in one transaction.
+    Cart is locked and read again first, order is refused if it no longer holds the lines that were paid for.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In User Session
+    order: tuple - Returned by prepare_order
+    invoice: dict - Checkout Session created by payment gateway
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: tuple - Subject, recipient and message of invoice email
     """
-    invoice = stripe_gateway.strip_payment_gateway(total_amount, email)
+    check_cart_existence, shipping_info, coupon_discount, coupon_using, total_amount, customer_id = order
 
-    """Check Quantity of Product in Grocery and decrease if Order is purchased By User"""
-    product_details = db.query(models.Product).filter(
-        and_(models.MyCart.user_id == user_id[0], models.Product.id == models.MyCart.product_id)).all()
-    for i, j in zip(product_details, check_cart_existence):
-        i.quantity = (getattr(i, "quantity") - getattr(j, "product_quantity"))
+    """Turn Stock Reservations of Cart into decrease of Product Quantity in Grocery"""
+    reservations.convert(db, current_user.id, check_cart_existence)
+
+    """Products are locked by now, cart lines are locked after them"""
+    order_placing_query.check_cart_unchanged(check_cart_existence,
+                                             cart_store.carts.items(db, current_user.id, for_update=True))
+    order_placing_query.use_coupon(db, coupon_using)
 
     for prod_name in check_cart_existence:
         new_order = models.OrderDetails(
-            user_id=user_id[0],
+            user_id=current_user.id,
             shipping_id=getattr(shipping_info, "id"),
             description=invoice['id'],
             payment_id=invoice['payment_intent'],
@@ -312,13 +460,70 @@ def order_payment(request, db, email, background_tasks):
         )
         db.add(new_order)
 
-    db.query(models.MyCart).filter(models.MyCart.user_id == user_id[0]).delete()
+    if cart_store.carts.clears_in_transaction:
+        cart_store.carts.clear(db, current_user.id, check_cart_existence)
+    order_placing_query.release_checkout(db, current_user.id)
+
+    """Catalog listings and their ETags show stock, bumped last so the version row is locked only briefly"""
+    cache_version.bump_version(db, cache_version.PRODUCTS)
     db.commit()
+    catalog_cache.catalog.invalidate()
+
+    """Cart kept outside SQL is emptied only once the order is committed"""
+    if not cart_store.carts.clears_in_transaction:
+        cart_store.carts.clear(db, current_user.id, check_cart_existence)
 
     """Formatting Email"""
-    subject, recipient, message = emailFormat.invoiceFormat(email, invoice, shipping_info,
-                                                            check_cart_existence, coupon_discount,
-                                                            total_amount)
+    return emailFormat.invoiceFormat(current_user.email, invoice, shipping_info, check_cart_existence,
+                                     coupon_discount, total_amount)
+
+
+def abandon_checkout(db, current_user):
+    """Roll back order being placed and end checkout of User, so User can checkout again."""
+    db.rollback()
+    order_placing_query.release_checkout(db, current_user.id)
+    db.commit()
+
+
+async def order_payment(request, db, current_user, background_tasks):
+    """
+    Payment gateway for pay for products owned. Database work runs in threadpool and invoice is awaited from
+    payment gateway, so checkout never blocks event loop.
+    Parameters
+    ----------------------------------------------------------
+    request: Schemas Object - Contains data about discount coupon
+    db: Database Object - Fetching Schemas Content
+    current_user: Principal - Current Logged-In User Session
+    background_tasks: BackgroundTasks - Complete Task in Background
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch status of Email-Confirmation of order placed
+    """
+
+    if current_user.is_admin:
+        raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
+
+    order = await run_in_threadpool(prepare_order, request, db, current_user)
+    total_amount, customer_id = order[-2:]
+
+    try:
+        """
+        Customer of User is created on first order only, and stored before it is used, so a retried
+        checkout reuses it
+        """
+        if customer_id is None:
+            customer_id = await stripe_gateway.create_customer(current_user.email)
+            customer_id = await run_in_threadpool(stripe_gateway.store_customer, db, current_user.id, customer_id)
+
+        """Generate Invoice for User Orders Using Payment Gateway"""
+        invoice = await stripe_gateway.payment_gateway(total_amount, customer_id)
+
+        subject, recipient, message = await run_in_threadpool(place_order, db, current_user, order, invoice)
+    except Exception:
+        await run_in_threadpool(abandon_checkout, db, current_user)
+        raise
 
     """Sending Email to User"""
     background_tasks.add_task(emailUtil.send_email, subject, recipient, message)
@@ -334,49 +539,47 @@ def webhook_received(db, payment_intent, payment_status):
     return {"Status": "Status Received"}
 
 
-def order_history(db, email):
+def order_history(db, current_user):
     """
     Users all Order History Till Date and its Info
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All data of Previous Orders
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-    history = db.query(models.OrderDetails).filter(models.OrderDetails.user_id == user_id[0]).order_by(desc(models.OrderDetails.id)).all()
+    history = db.query(models.OrderDetails).filter(models.OrderDetails.user_id == current_user.id).order_by(desc(models.OrderDetails.id)).all()
     if not history:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
     return history
 
 
-def return_item(item_id: int, db, email):
+def return_item(item_id: int, db, current_user):
     """
     Cancel Order and RefundOrder Amount to Wallet Section.
     Parameters
     ----------------------------------------------------------
     item_id: int - Order ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of order cancellation
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
     my_order = db.query(models.OrderDetails).filter(and_(models.OrderDetails.id == item_id,
-                                                         models.OrderDetails.user_id == user_id[0],
+                                                         models.OrderDetails.user_id == current_user.id,
                                                          models.OrderDetails.payment_status != "refunded")).first()
     if not my_order:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
@@ -385,7 +588,7 @@ def return_item(item_id: int, db, email):
 
     refund_amount = getattr(my_order, "total_amount")
     refund_amount -= (refund_amount*0.1)
-    my_wallet = db.query(models.MyWallet).filter(models.MyWallet.user_id == user_id[0]).first()
+    my_wallet = db.query(models.MyWallet).filter(models.MyWallet.user_id == current_user.id).first()
     my_wallet.acc_balance = (getattr(my_wallet, "acc_balance") + refund_amount)
 
     db.commit()
@@ -393,26 +596,25 @@ def return_item(item_id: int, db, email):
     return messages.json_status_response(200, "Amount will be Refunded to your Wallet. 10% Cancellation Charges are applied.")
 
 
-def cancel_order(order_id: str, db, email):
+def cancel_order(order_id: str, db, current_user):
     """
     Cancel Order and RefundOrder Amount to Wallet Section.
     Parameters
     ----------------------------------------------------------
     order_id: str - Order ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of order cancellation
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
     my_order = db.query(models.OrderDetails).filter(and_(models.OrderDetails.description == order_id,
-                                                         models.OrderDetails.user_id == user_id[0],
+                                                         models.OrderDetails.user_id == current_user.id,
                                                          models.OrderDetails.payment_status != "refunded")).all()
     if not my_order:
         raise HTTPException(status_code=404, detail=messages.RECORD_NOT_FOUND)
@@ -423,7 +625,7 @@ def cancel_order(order_id: str, db, email):
         i.order_status = "returned"
 
     refund_amount -= (refund_amount * 0.1)
-    my_wallet = db.query(models.MyWallet).filter(models.MyWallet.user_id == user_id[0]).first()
+    my_wallet = db.query(models.MyWallet).filter(models.MyWallet.user_id == current_user.id).first()
     my_wallet.acc_balance = (getattr(my_wallet, "acc_balance") + refund_amount)
 
     db.commit()
@@ -431,21 +633,21 @@ def cancel_order(order_id: str, db, email):
     return messages.json_status_response(200, "Amount will be Refunded to your Wallet. 10% Cancellation Charges are applied.")
 
 
-def track_order_status(request, db, email):
+def track_order_status(request, db, current_user):
     """
     Cancel Order and RefundOrder Amount to Wallet Section.
     Parameters
     ----------------------------------------------------------
     request: schemas Object - Order ID
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Status of order cancellation
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
     check_order_id = db.query(models.OrderDetails).filter(models.OrderDetails.description == request.order_tracking_id).all()
@@ -456,38 +658,42 @@ def track_order_status(request, db, email):
     return check_order_id
 
 
-def view_balance(db, email):
+def view_balance(db, current_user):
     """
     Fetch the Account Balance in Wallet.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
-    email: str - Current Logged-In User Session
+    current_user: Principal - Current Logged-In User Session
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch Available balance in users wallet
     """
-    if admin.is_admin(email, db):
+    if current_user.is_admin:
         raise HTTPException(status_code=401, detail=messages.NOT_AUTHORIZE_401)
 
-    user_id = db.query(models.User.id).filter(models.User.email == email).first()
-    balance = db.query(models.MyWallet).filter(models.MyWallet.user_id == user_id[0]).first()
+    balance = db.query(models.MyWallet).filter(models.MyWallet.user_id == current_user.id).first()
 
     return balance
 
 
-def show_discount_coupon(db: Session):
+def show_discount_coupon(db: Session, request, response):
     """
-    Return all discount coupon details .
+    Return all discount coupon details, or 304 if client has the latest version already.
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Fetch All Data of applicable coupons
     """
+    not_modified = etag.conditional_response(request, response, db, cache_version.COUPONS)
+    if not_modified:
+        return not_modified
     return db.query(models.DiscountCoupon).all()
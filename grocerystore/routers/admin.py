@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, status, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import datetime
 from fastapi_pagination import Page, add_pagination, paginate
 from .. import database, schemas, oauth2
 from ..repository import admin
@@ -19,7 +21,7 @@ get_db = database.get_db
 
 
 @router.get("/get_items", response_model=Page[schemas.Product])
-def all_products(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def all_products(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     FETCH ALL PRODUCTS AVAILABLE IN GROCERY
     Parameters
@@ -32,12 +34,34 @@ def all_products(db: Session = Depends(get_db), current_user: schemas.User = Dep
     ----------------------------------------------------------
     response: json object - Fetch Data as per Schema-Content
     """
-    return paginate(admin.all_products(db, current_user.email))
+    return paginate(admin.all_products(db, current_user))
+
+
+@router.get("/get_items/cursor", response_model=schemas.ProductCursorPage)
+def all_products_page(cursor: Optional[str] = None, size: int = 50, sort_by: str = 'id', descending: bool = False,
+                      db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    FETCH PRODUCTS PAGE BY PAGE USING CURSOR
+    Parameters
+    ----------------------------------------------------------
+    cursor: str - Cursor returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch one page of Products with next page cursor
+    """
+    return admin.all_products_page(db, current_user, cursor, size, sort_by, descending)
 
 
 @router.post("/create_items", status_code=status.HTTP_201_CREATED)
 def add_product(request: List[schemas.ProductBase], db: Session = Depends(get_db),
-                current_user: schemas.User = Depends(oauth2.get_current_user)):
+                current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     ADD PRODUCTS TO SHOW IN GROCERY
     Parameters
@@ -51,12 +75,33 @@ def add_product(request: List[schemas.ProductBase], db: Session = Depends(get_db
     ----------------------------------------------------------
     response: json object - Status of Products added or not
     """
-    admin.add_product(db, request, current_user.email)
+    admin.add_product(db, request, current_user)
     return {'DB Status': 'Item Added Successfully'}
 
 
+@router.post("/import_items", summary="Bulk Import Products streamed as CSV or NDJSON")
+async def import_products(request: Request, file_format: str = 'ndjson', on_conflict: str = 'skip',
+                          db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    IMPORT PRODUCTS FROM SUPPLIER CATALOG
+    Parameters
+    ----------------------------------------------------------
+    request: Request - Raw body with one product per line (csv with header row or ndjson)
+    file_format: str - csv | ndjson
+    on_conflict: str - skip | update products whose description exists already
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Count of inserted and updated products, skipped rows and errors per row
+    """
+    return await admin.import_products(request.stream(), file_format, on_conflict, db, current_user)
+
+
 @router.put("/update_item/{item_id}", status_code=status.HTTP_200_OK)
-def update_product(item_id: int, item: schemas.ProductBase, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def update_product(item_id: int, item: schemas.ProductBase, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     UPDATE PRODUCTS FOR GROCERY
     Parameters
@@ -71,11 +116,30 @@ def update_product(item_id: int, item: schemas.ProductBase, db: Session = Depend
     ----------------------------------------------------------
     response: json object - Fetch updates made on products
     """
-    return admin.update_product(item_id, db, item, current_user.email)
+    return admin.update_product(item_id, db, item, current_user)
+
+
+@router.patch("/update_items", summary="Partially Update many Products at once")
+def update_products(request: List[schemas.ProductPatch], db: Session = Depends(get_db),
+                    current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    UPDATE ONLY CHANGED FIELDS OF MANY PRODUCTS
+    Parameters
+    ----------------------------------------------------------
+    request: Schemas Object - List of product id with changed fields
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Status of update of every product id
+    """
+    return admin.update_products(db, request, current_user)
 
 
 @router.delete("/delete_item/{item_id}", status_code=status.HTTP_200_OK)
-def delete_product(item_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def delete_product(item_id: int, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     DELETE ITEMS NOT IN GROCERY
     Parameters
@@ -89,11 +153,11 @@ def delete_product(item_id: int, db: Session = Depends(get_db), current_user: sc
     ----------------------------------------------------------
     response: json object - Fetch Data that deleted
     """
-    return admin.delete_product(item_id, db, current_user.email)
+    return admin.delete_product(item_id, db, current_user)
 
 
 @router.get("/view_orders", summary="View all Order Details by each User", response_model=Page[schemas.OrderDetails])
-def view_orders(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def view_orders(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     FETCH ALL ORDERS PLACED BY USER AND CHECK ORDER STATUS
     Parameters
@@ -106,12 +170,39 @@ def view_orders(db: Session = Depends(get_db), current_user: schemas.User = Depe
     ----------------------------------------------------------
     response: json object - Fetch All Data Available in Grocery
     """
-    return paginate(admin.view_orders(db, current_user.email))
+    return paginate(admin.view_orders(db, current_user))
+
+
+@router.get("/export_orders", summary="Export Orders as CSV or NDJSON stream")
+def export_orders(file_format: str = 'ndjson', order_status: Optional[str] = None, user_id: Optional[int] = None,
+                  date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                  db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    EXPORT ORDERS WITH OPTIONAL FILTERS
+    Parameters
+    ----------------------------------------------------------
+    file_format: str - csv | ndjson
+    order_status: str - Export only orders with this status
+    user_id: int - Export only orders of this user
+    date_from: date - Export orders placed on or after this date
+    date_to: date - Export orders placed on or before this date
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: Stream - Exported orders file
+    """
+    rows = admin.export_orders(db, current_user, file_format, order_status, user_id, date_from, date_to)
+    media_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(rows, media_type=media_type,
+                             headers={'Content-Disposition': f'attachment; filename="orders.{file_format}"'})
 
 
 @router.post("/filter_order_status", summary="Filter the order Status By Order Status", response_model=Page[schemas.OrderDetails])
 def filter_order_status(request: schemas.FilterOrderStatus, db: Session = Depends(get_db),
-                        current_user: schemas.User = Depends(oauth2.get_current_user)):
+                        current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
         Admin Filters all Order by its status
         Parameters
@@ -125,12 +216,12 @@ def filter_order_status(request: schemas.FilterOrderStatus, db: Session = Depend
         ----------------------------------------------------------
         response: json object - Updates Status as per its tracking flow.
         """
-    return paginate(admin.filter_order_status(request, db, current_user.email))
+    return paginate(admin.filter_order_status(request, db, current_user))
 
 
 @router.put("/update_order_status", summary="Update the order Status for tracking purpose", status_code=status.HTTP_200_OK)
 def update_order_status(request: schemas.OrderStatus, db: Session = Depends(get_db),
-                        current_user: schemas.User = Depends(oauth2.get_current_user)):
+                        current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
         Admin Updates Order Status as per its tracking system
         Parameters
@@ -144,12 +235,12 @@ def update_order_status(request: schemas.OrderStatus, db: Session = Depends(get_
         ----------------------------------------------------------
         response: json object - Updates Status as per its tracking flow.
         """
-    return admin.update_order_status(request, db, current_user.email)
+    return admin.update_order_status(request, db, current_user)
 
 
 @router.post("/add_discount_coupon", summary="Add Discount Coupons for Users", status_code=status.HTTP_201_CREATED)
 def add_discount_coupon(request: List[schemas.DiscountCoupon], db: Session = Depends(get_db),
-                        current_user: schemas.User = Depends(oauth2.get_current_user)):
+                        current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Admin adds Discount Coupon and its records
     Parameters
@@ -163,15 +254,19 @@ def add_discount_coupon(request: List[schemas.DiscountCoupon], db: Session = Dep
     ----------------------------------------------------------
     response: json object - Fetch Status of Coupons
     """
-    return admin.discount_coupon(db, request, current_user.email)
+    return admin.discount_coupon(db, request, current_user)
 
 
 @router.get("/show_discount_coupon")
-def show_discount_coupon(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def show_discount_coupon(request: Request, response: Response, db: Session = Depends(get_db),
+                         current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Get All the Discount Coupons Visible.
+    Returns 304 when If-None-Match header matches ETag of current coupons version.
     Parameters
     ----------------------------------------------------------
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
     db: Database Object - Fetching Schemas Content
     current_user: User Object - Current Logged-In User Session
     ----------------------------------------------------------
@@ -180,7 +275,93 @@ def show_discount_coupon(db: Session = Depends(get_db), current_user: schemas.Us
     ----------------------------------------------------------
     response: json object - Fetch Data of all applicable coupons
     """
-    return admin.show_discount_coupon(db, current_user.email)
+    return admin.show_discount_coupon(db, current_user, request, response)
+
 
+@router.post("/provision_users", summary="Register many Users at once")
+async def provision_users(request: List[schemas.User], db: Session = Depends(get_db),
+                          current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    BULK PROVISION USER ACCOUNTS ALONG WITH THEIR WALLETS
+    Parameters
+    ----------------------------------------------------------
+    request: Schemas Object - List of users to register
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Outcome of every row: created | exists | duplicate | invalid | conflict
+    """
+    return await admin.provision_users(request, db, current_user)
+
+
+@router.put("/promote_user/{user_id}", summary="Grant Admin role to a User", status_code=status.HTTP_200_OK)
+def promote_user(user_id: int, db: Session = Depends(get_db),
+                 current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Promote User to Admin. User needs to login again to receive admin access.
+    Parameters
+    ----------------------------------------------------------
+    user_id: int - ID of User to promote
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Promotion Status
+    """
+    return admin.promote_user(user_id, db, current_user)
+
+
+@router.get("/cache_stats", summary="Catalog and Token Cache counters of this worker")
+def cache_stats(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Get Hit/Miss counters of Catalog and Verified Token Cache.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Catalog Cache counters
+    """
+    return admin.cache_stats(db, current_user)
+
+
+@router.delete("/token_cache", summary="Flush Verified Token Cache of this worker", status_code=status.HTTP_200_OK)
+def flush_token_cache(current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Flush Verified Token Cache, to be called after secret keys are rotated.
+    Parameters
+    ----------------------------------------------------------
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Flush Status
+    """
+    return admin.flush_token_cache(current_user)
+
+
+@router.get("/hashing_stats", summary="Password Hashing queue depth of this worker")
+def hashing_stats(current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Get queue depth and counters of Password Hashing Executor.
+    Parameters
+    ----------------------------------------------------------
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Hashing Executor metrics
+    """
+    return admin.hashing_stats(current_user)
 
 add_pagination(router)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, BackgroundTasks
+from typing import Optional
 from sqlalchemy.orm import Session
 from .. import schemas, database, oauth2
 from ..repository import authentication
@@ -18,7 +19,7 @@ get_db = database.get_db
 
 
 @router.post('/register')
-def registration(request: schemas.UserRegister, db: Session = Depends(get_db)):
+async def registration(request: schemas.UserRegister, db: Session = Depends(get_db)):
     """
     Registration User Authentication Requirements
     Call Register function in repository directory to validate credentials & validations.
@@ -32,11 +33,11 @@ def registration(request: schemas.UserRegister, db: Session = Depends(get_db)):
     ----------------------------------------------------------
     response: json object - Fetch Registered Data of the user
     """
-    return authentication.register(request, db)
+    return await authentication.register(request, db)
 
 
 @router.post('/login')
-def login(request: schemas.Login, db: Session = Depends(get_db)):
+async def login(request: schemas.Login, db: Session = Depends(get_db)):
     """
     Login Process for both Admin and User.
     Call Login function in repository directory to validate credentials and provide access token.
@@ -50,45 +51,68 @@ def login(request: schemas.Login, db: Session = Depends(get_db)):
     ----------------------------------------------------------
     response: json object - Fetch Access and Refresh Tokens
     """
-    return authentication.login(request, db)
+    return await authentication.login(request, db)
 
 
 @router.get('/new_access_token')
-def new_access_token(current_user: schemas.User = Depends(oauth2.get_current_user_access_token)):
+def new_access_token(token_data: schemas.TokenData = Depends(oauth2.get_current_user_access_token),
+                     db: Session = Depends(get_db)):
     """
     Router to Create New Access Token by taking Refresh Token
     Parameters
     ----------------------------------------------------------
-    current_user: User Object - Current Logged-In User Session
+    token_data: TokenData - Claims of verified Refresh Token
+    db: Database Object - Fetching Schemas Content
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
-    response: json object - Generates new access token from refresh token
+    response: json object - Generates new access token and refresh token from refresh token
+    """
+
+    return authentication.new_access_token(token_data, db)
+
+
+@router.post('/logout')
+def logout(request: Optional[schemas.Logout] = None, db: Session = Depends(get_db),
+           token_data: schemas.TokenData = Depends(oauth2.get_current_user)):
     """
+    Logout from current session by revoking its Access Token and optionally its Refresh Token.
+    Parameters
+    ----------------------------------------------------------
+    request: Schemas Object - Optional Refresh Token to revoke
+    db: Database Object - Fetching Schemas Content
+    token_data: TokenData - Claims of verified Access Token
+    ----------------------------------------------------------
 
-    return authentication.new_access_token(current_user.email)
+    Returns
+    ----------------------------------------------------------
+    response: json object - Logout Status
+    """
+    return authentication.logout(token_data, request, db)
 
 
 @router.post('/forgot_password')
-def forgot_password(request: schemas.ForgotPassword, db: Session = Depends(get_db)):
+def forgot_password(request: schemas.ForgotPassword, background_tasks: BackgroundTasks,
+                    db: Session = Depends(get_db)):
     """
     Check User Existence
     Parameters
     ----------------------------------------------------------
     db: Database Object - Fetching Schemas Content
     request: Schemas Object - Contains data to fetch email
+    background_tasks: BackgroundTasks - Send Email after response is returned
     ----------------------------------------------------------
 
     Returns
     ----------------------------------------------------------
     response: json object - Receive Email Message status/Confirmation
     """
-    return authentication.forgot_password(request, db)
+    return authentication.forgot_password(request, db, background_tasks)
 
 
 @router.post('/reset_password/{reset_token}')
-def reset_password(reset_token: str, request: schemas.ResetPassword, db: Session = Depends(get_db)):
+async def reset_password(reset_token: str, request: schemas.ResetPassword, db: Session = Depends(get_db)):
     """
     Reset Password using token Sent via Mail
     Parameters
@@ -102,4 +126,4 @@ def reset_password(reset_token: str, request: schemas.ResetPassword, db: Session
     ----------------------------------------------------------
     response: json object - Fetch data for Password Update Confirmation
     """
-    return authentication.reset_password(reset_token, request, db)
+    return await authentication.reset_password(reset_token, request, db)
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, status, Request, Header, BackgroundTasks
+from fastapi import APIRouter, Depends, status, Request, Response, Header, BackgroundTasks, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from fastapi_pagination import Page, add_pagination, paginate, LimitOffsetPage
 from .. import database, schemas, oauth2
 from ..repository import users
+from ..utils import etag, cache_version
 import stripe
 import os
 
@@ -22,11 +23,14 @@ get_db = database.get_db
 
 @router.get("/view_products", response_model=Page[schemas.Product])
 @router.get("/view_products/limit-offset", response_model=LimitOffsetPage[schemas.Product])
-def view_products(db: Session = Depends(get_db)):
+def view_products(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Any User has access to view all the products available in grocery db.
+    Returns 304 when If-None-Match header matches ETag of current catalog version.
     Parameters
     ----------------------------------------------------------
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
     db: Database Object - Fetching Schemas Content
     ----------------------------------------------------------
 
@@ -34,9 +38,74 @@ def view_products(db: Session = Depends(get_db)):
     ----------------------------------------------------------
     response: json object - Fetch Data of all Products available in Grocery.
     """
+    not_modified = etag.conditional_response(request, response, db, cache_version.PRODUCTS)
+    if not_modified:
+        return not_modified
     return paginate(users.view_products(db))
 
 
+@router.get("/view_products/cursor", response_model=schemas.ProductCursorPage)
+def view_products_page(cursor: Optional[str] = None, size: int = 50, sort_by: str = 'id', descending: bool = False,
+                       db: Session = Depends(get_db)):
+    """
+    Keyset Pagination over products. Pass next_cursor of the response to fetch the following page.
+    Parameters
+    ----------------------------------------------------------
+    cursor: str - Cursor returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch one page of Products with next page cursor.
+    """
+    return users.view_products_page(db, cursor, size, sort_by, descending)
+
+
+@router.get("/browse", response_model=schemas.ProductBrowsePage)
+def browse_products(product_type: Optional[List[str]] = Query(None), price_bucket: Optional[List[str]] = Query(None),
+                    cursor: Optional[str] = None, size: int = 50, sort_by: str = 'id', descending: bool = False,
+                    db: Session = Depends(get_db)):
+    """
+    Browse Products by one or more product types and price buckets with product count of every facet.
+    Parameters
+    ----------------------------------------------------------
+    product_type: list - Product types to filter
+    price_bucket: list - Price buckets to filter, like 0-50 or 1000+
+    cursor: str - Cursor returned with previous page
+    size: int - Number of Products per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch one page of Products with next page cursor and facet counts.
+    """
+    return users.browse_products(db, product_type, price_bucket, cursor, size, sort_by, descending)
+
+
+@router.get("/products", response_model=List[schemas.Product])
+def products_by_ids(ids: str, db: Session = Depends(get_db)):
+    """
+    Fetch details of many Products at once, like for rendering carts or wishlists.
+    Parameters
+    ----------------------------------------------------------
+    ids: str - Comma separated Product IDs
+    db: Database Object - Fetching Schemas Content
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Fetch Data of requested Products in request order.
+    """
+    return users.products_by_ids(ids, db)
+
+
 @router.post("/search_products", response_model=List[schemas.Product])
 def search_products(request: schemas.SearchProduct, db: Session = Depends(get_db)):
     """
@@ -55,7 +124,7 @@ def search_products(request: schemas.SearchProduct, db: Session = Depends(get_db
 
 
 @router.post("/add_to_cart", status_code=status.HTTP_200_OK)
-def add_to_cart(request: schemas.AddToCart, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def add_to_cart(request: schemas.AddToCart, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Add your favorite Item to your Cart by entering item id from view products/ search products.
     Parameters
@@ -69,11 +138,30 @@ def add_to_cart(request: schemas.AddToCart, db: Session = Depends(get_db), curre
     ----------------------------------------------------------
     response: json object - Fetch Data Confirmation of products added
     """
-    return users.add_to_cart(request, db, current_user.email)
+    return users.add_to_cart(request, db, current_user)
+
+
+@router.post("/add_to_cart/batch", status_code=status.HTTP_200_OK)
+def add_many_to_cart(request: List[schemas.AddToCart], db: Session = Depends(get_db),
+                     current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Add whole Shopping List or previous Basket to your Cart in one request.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    request: Schemas Object - List of item id and quantity to add to cart
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Status of every item added to cart
+    """
+    return users.add_many_to_cart(request, db, current_user)
 
 
-@router.get("/view_my_cart", response_model=List[schemas.MyCartBase])
-def my_cart(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+@router.get("/view_my_cart", response_model=List[schemas.MyCart])
+def my_cart(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     User can view their Cart and their Products Added to cart
     Parameters
@@ -86,11 +174,28 @@ def my_cart(db: Session = Depends(get_db), current_user: schemas.User = Depends(
     ----------------------------------------------------------
     response: json object - Fetch All data available in Users-Cart
     """
-    return users.my_cart(db, current_user.email)
+    return users.my_cart(db, current_user)
+
+
+@router.get("/cart_summary", response_model=schemas.CartSummary)
+def cart_summary(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
+    """
+    Item Count and Subtotal of your Cart, for cart badge
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    current_user: User Object - Current Logged-In User Session
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: json object - Cart Summary of User
+    """
+    return users.cart_summary(db, current_user)
 
 
 @router.delete("/delete_item_from_cart/{item_id}", status_code=status.HTTP_200_OK)
-def delete_item_from_cart(item_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def delete_item_from_cart(item_id: int, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Delete Item from User Cart
     Parameters
@@ -104,11 +209,11 @@ def delete_item_from_cart(item_id: int, db: Session = Depends(get_db), current_u
     ----------------------------------------------------------
     response: json object - Fetch Status of Product removed from cart
     """
-    return users.delete_item_from_cart(item_id, db, current_user.email)
+    return users.delete_item_from_cart(item_id, db, current_user)
 
 
 @router.post("/shipping_info")
-def add_shipping_info(request: schemas.AddShippingInfo, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def add_shipping_info(request: schemas.AddShippingInfo, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Add Shipping Info like Address and other stuff
     Parameters
@@ -122,11 +227,11 @@ def add_shipping_info(request: schemas.AddShippingInfo, db: Session = Depends(ge
     ----------------------------------------------------------
     response: json object - Fetch Status of Address added
     """
-    return users.add_shipping_info(request, db, current_user.email)
+    return users.add_shipping_info(request, db, current_user)
 
 
 @router.get("/show_shipping_info", response_model=List[schemas.ShippingInfoBase])
-def show_shipping_info(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def show_shipping_info(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Fetch Shipping Address of Particular User
     Parameters
@@ -139,7 +244,7 @@ def show_shipping_info(db: Session = Depends(get_db), current_user: schemas.User
     ----------------------------------------------------------
     response: json object - Fetch All data/addresses of User
     """
-    return users.show_shipping_info(db, current_user.email)
+    return users.show_shipping_info(db, current_user)
 
 
 @router.post('/webhook')
@@ -176,7 +281,7 @@ async def webhook_received(request: Request, db: Session = Depends(get_db), stri
 async def order_payment_page(request: schemas.CheckDiscountCoupon,
                              background_tasks: BackgroundTasks,
                              db: Session = Depends(get_db),
-                             current_user: schemas.User = Depends(oauth2.get_current_user)):
+                             current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Get the Payment Link to pay for your Order
     Parameters
@@ -191,11 +296,11 @@ async def order_payment_page(request: schemas.CheckDiscountCoupon,
     ----------------------------------------------------------
     response: json object - Fetch status of Email-Confirmation of order placed
     """
-    return users.order_payment(request, db, current_user.email, background_tasks)
+    return await users.order_payment(request, db, current_user, background_tasks)
 
 
 @router.get("/order_history")
-def order_history(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def order_history(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Show User their Last Order History.
     Parameters
@@ -208,11 +313,11 @@ def order_history(db: Session = Depends(get_db), current_user: schemas.User = De
     ----------------------------------------------------------
     response: json object - Fetch All data of Previous Orders
     """
-    return users.order_history(db, current_user.email)
+    return users.order_history(db, current_user)
 
 
 @router.delete('/return_item/{item_id}')
-def return_item(item_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def return_item(item_id: int, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Fetch the item_id from User to cancel the order and refund amount to Wallet.
     Parameters
@@ -226,11 +331,11 @@ def return_item(item_id: int, db: Session = Depends(get_db), current_user: schem
     ----------------------------------------------------------
     response: json object - Fetch Status of order cancellation
     """
-    return users.return_item(item_id, db, current_user.email)
+    return users.return_item(item_id, db, current_user)
 
 
 @router.delete('/cancel_order/{order_id}')
-def cancel_order(order_id: str, db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def cancel_order(order_id: str, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Fetch the item_id from User to cancel the order and refund amount to Wallet.
     Parameters
@@ -244,12 +349,12 @@ def cancel_order(order_id: str, db: Session = Depends(get_db), current_user: sch
     ----------------------------------------------------------
     response: json object - Fetch Status of order cancellation
     """
-    return users.cancel_order(order_id, db, current_user.email)
+    return users.cancel_order(order_id, db, current_user)
 
 
 @router.post('/track_order_status', summary="Track the Status of Items Ordered", response_model=List[schemas.TrackOrderStatus])
 def track_order_status(request: schemas.TrackingID, db: Session = Depends(get_db),
-                       current_user: schemas.User = Depends(oauth2.get_current_user)):
+                       current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Fetch the item_id from User to cancel the order and refund amount to Wallet.
     Parameters
@@ -263,11 +368,11 @@ def track_order_status(request: schemas.TrackingID, db: Session = Depends(get_db
     ----------------------------------------------------------
     response: json object - Fetch Status of order Tracking
     """
-    return users.track_order_status(request, db, current_user.email)
+    return users.track_order_status(request, db, current_user)
 
 
 @router.get('/view_balance', response_model=schemas.WalletBalance)
-def view_balance(db: Session = Depends(get_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+def view_balance(db: Session = Depends(get_db), current_user: schemas.Principal = Depends(oauth2.get_current_principal)):
     """
     Fetch the User Wallet Balance.
     Parameters
@@ -280,15 +385,18 @@ def view_balance(db: Session = Depends(get_db), current_user: schemas.User = Dep
     ----------------------------------------------------------
     response: json object - Fetch Available balance in users wallet
     """
-    return users.view_balance(db, current_user.email)
+    return users.view_balance(db, current_user)
 
 
 @router.get('/show_discount_coupon', response_model=List[schemas.ShowDiscountCoupon])
-def show_discount_coupon(db: Session = Depends(get_db)):
+def show_discount_coupon(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Get All the Discount Coupons Visible.
+    Returns 304 when If-None-Match header matches ETag of current coupons version.
     Parameters
     ----------------------------------------------------------
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
     db: Database Object - Fetching Schemas Content
     ----------------------------------------------------------
 
@@ -296,7 +404,7 @@ def show_discount_coupon(db: Session = Depends(get_db)):
     ----------------------------------------------------------
     response: json object - Fetch All Data of applicable coupons
     """
-    return users.show_discount_coupon(db)
+    return users.show_discount_coupon(db, request, response)
 
 
 add_pagination(router)
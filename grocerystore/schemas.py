@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 import datetime
 
 """
@@ -29,6 +29,38 @@ class Product(ProductBase):
         orm_mode = True
 
 
+class ProductPatch(BaseModel):
+    """Admin UseCase: Product ID with only those fields that needs to be changed."""
+    id: int
+    image_file: Optional[str] = None
+    product_type: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProductCursorPage(BaseModel):
+    """User/Admin UseCase: One page of products with cursor to fetch the next page."""
+    items: List[Product]
+    size: int
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProductBrowsePage(ProductCursorPage):
+    """User UseCase: One page of filtered products along with product count of every facet."""
+    facets: Dict[str, Dict[str, int]]
+
+    class Config:
+        orm_mode = True
+
+
 class User(BaseModel):
     """User UseCase: Registration Schema requirements for User"""
     username: str
@@ -121,6 +153,14 @@ class MyCartBase(MyCart):
         orm_mode = True
 
 
+class CartSummary(BaseModel):
+    """User UseCase: Totals of cart for cart badge and checkout, without cart lines."""
+    item_count: int
+    line_count: int
+    subtotal: float
+    product_types: Dict[str, float]
+
+
 class AddToCart(BaseModel):
     """User UseCase: Fields user have to enter while adding products to cart."""
     item_id: int
@@ -135,6 +175,8 @@ class SearchProduct(BaseModel):
     item_name: Optional[str] = ''
     max_price: Optional[float] = 1000
     min_price: Optional[float] = 0
+    limit: Optional[int] = 50
+    offset: Optional[int] = 0
 
     class Config:
         orm_mode = True
@@ -250,8 +292,25 @@ class Token(BaseModel):
 
 
 class TokenData(BaseModel):
-    """User UseCase: for verifying above data email is mandatory to get user data."""
+    """User UseCase: Claims of verified token, enough to identify user without querying database."""
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    token_version: int = 0
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+class Principal(BaseModel):
+    """User/Admin UseCase: Identity of Logged-In User resolved once per request."""
+    id: int
+    email: str
+    is_admin: bool = False
+
+
+class Logout(BaseModel):
+    """User UseCase: Refresh token to revoke along with access token on logout."""
+    refresh_token: Optional[str] = None
 
 
 class ForgotPassword(BaseModel):
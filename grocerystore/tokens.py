@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from grocerystore import schemas
+from grocerystore.utils.token_cache import verified_tokens
 from dotenv import load_dotenv
 import os
+import uuid
 
 """
 Following file generates Token after each correct Authentication and need to re-login once 30 min
@@ -16,6 +18,66 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 JWT_REFRESH_SECRET_KEY = os.environ.get('JWT_REFRESH_SECRET_KEY')
+ROLE_ADMIN = 'admin'
+ROLE_USER = 'user'
+
+
+def user_claims(user):
+    """
+    Claims carried by every token so that requests can identify user without database lookup.
+    Parameters
+    ----------------------------------------------------------
+    user: User Object - User the token is issued for
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: dict - sub (email), uid, role and token version claims
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": ROLE_ADMIN if user.is_admin else ROLE_USER,
+        "ver": user.token_version or 0,
+    }
+
+
+def token_data(payload: dict, credentials_exception):
+    """Build TokenData from decoded claims, tokens without user id or token id claim are rejected."""
+    email: str = payload.get("sub")
+    user_id = payload.get("uid")
+    jti = payload.get("jti")
+    if not email or not isinstance(user_id, int) or not jti:
+        raise credentials_exception
+    return schemas.TokenData(email=email, user_id=user_id, role=payload.get("role"),
+                             token_version=payload.get("ver") or 0, jti=jti, expires_at=payload.get("exp"))
+
+
+def decode_token(token: str, kind: str, secret: str, credentials_exception):
+    """
+    Verify signature and expiry of token once, then serve its claims from verified token cache until exp.
+    Parameters
+    ----------------------------------------------------------
+    token: str - encoded JWT
+    kind: str - access | refresh, tokens of both kinds are cached apart
+    secret: str - Key the token was signed with
+    credentials_exception: Exception - Invalid Credentials exception
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: TokenData - token data
+    """
+    cached = verified_tokens.get(kind, token)
+    if cached is not None:
+        return cached
+    try:
+        payload = jwt.decode(token, secret, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    data = token_data(payload, credentials_exception)
+    verified_tokens.set(kind, token, data, payload.get("exp"))
+    return data
 
 
 def create_access_token(data: dict):
@@ -32,7 +94,7 @@ def create_access_token(data: dict):
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -51,7 +113,7 @@ def create_refresh_token(data: dict):
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     encoded_jwt = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -68,18 +130,9 @@ def verify_token(token: str, credentials_exception):
 
     Returns
     ----------------------------------------------------------
-    response: str - Token Data
+    response: TokenData - Token Data
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-
-        return token_data
-    except JWTError:
-        raise credentials_exception
+    return decode_token(token, 'access', SECRET_KEY, credentials_exception)
 
 
 def verify_refresh_token(token: str, credentials_exception):
@@ -93,15 +146,6 @@ def verify_refresh_token(token: str, credentials_exception):
 
     Returns
     ----------------------------------------------------------
-    response: str - token data
+    response: TokenData - token data
     """
-    try:
-        payload = jwt.decode(token, JWT_REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-
-        return token_data
-    except JWTError:
-        raise credentials_exception
+    return decode_token(token, 'refresh', JWT_REFRESH_SECRET_KEY, credentials_exception)
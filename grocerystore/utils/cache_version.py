@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from .. import models
+
+load_dotenv()
+
+"""
+Version Counters of cached tables. Every write to a cached table bumps its counter in the same transaction,
+so all gunicorn workers notice the change on their next version check and drop their stale copies.
+"""
+
+PRODUCTS = 'products'
+COUPONS = 'coupons'
+
+VERSION_CHECK_SECONDS = float(os.environ.get('CACHE_VERSION_CHECK_SECONDS', 2))
+
+
+def read_version(db, name):
+    """Fetch current version of the cached table from database."""
+    row = db.query(models.CacheVersion.version).filter(models.CacheVersion.name == name).first()
+    return row[0] if row else 0
+
+
+def bump_version(db, name):
+    """Increase version of the cached table. Must be called before commit of the write it belongs to."""
+    updated = db.query(models.CacheVersion).filter(models.CacheVersion.name == name).update(
+        {models.CacheVersion.version: models.CacheVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        db.add(models.CacheVersion(name=name, version=1))
+
+
+class VersionTracker:
+    """Remembers last seen version of each table and re-reads it from database at most once per interval."""
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, name):
+        """Return version of the table, reading database only if last check is older than interval."""
+        now = time.monotonic()
+        with self._lock:
+            known = self._versions.get(name)
+        if known is not None and now - known[1] < self.check_interval:
+            return known[0]
+
+        version = read_version(db, name)
+        with self._lock:
+            self._versions[name] = (version, now)
+        return version
+
+    def expire(self, name):
+        """Forget version of the table so that next call reads it again from database."""
+        with self._lock:
+            self._versions.pop(name, None)
+
+
+version_tracker = VersionTracker(VERSION_CHECK_SECONDS)
@@ -0,0 +1,376 @@
+import json
+import os
+import time
+from fastapi import HTTPException, status
+from sqlalchemy import select, literal, literal_column, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from dotenv import load_dotenv
+from ..repository import messages
+from .. import models, schemas
+from . import cart_summary, reservations
+from .dialect import dialect_insert
+
+load_dotenv()
+
+"""
+Cart Storage. Cart lines live either in my_cart table or in Redis (one hash per user), selected with
+CART_BACKEND=sql|redis. Both stores take the same calls, so repository functions and checkout do not care
+where the cart is kept. With Redis, cart lines reach SQL only as order rows at checkout. Each store keeps
+cart summary up to date along with every change of cart lines. Stock of every cart line is reserved in SQL
+by both stores, so quantities in carts never exceed stock.
+"""
+
+CART_BACKEND = os.environ.get('CART_BACKEND', 'sql')
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+PENDING_WRITES = 'pending_cart_writes'
+
+
+CART_COLUMNS = ['user_id', 'product_id', 'product_name', 'product_type', 'product_quantity', 'product_price', 'total']
+
+
+def stock_error(db, product_id: int, quantity: int):
+    """Explain why quantity of product could not be added to cart."""
+    product = db.query(models.Product.available).filter(models.Product.id == product_id).first()
+    if not product:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.Product_Not_Found_404(product_id))
+    if quantity > product.available:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                             detail=messages.Stock_Unavailable_404(max(product.available, 0)))
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.OUT_OF_STOCK)
+
+
+def add_on_conflict(statement):
+    """Increase quantity of existing cart line instead."""
+    cart = models.MyCart.__table__
+    return statement.on_conflict_do_update(
+        index_elements=['user_id', 'product_id'],
+        set_={'product_quantity': cart.c.product_quantity + statement.excluded.product_quantity,
+              'total': cart.c.total + statement.excluded.total})
+
+
+def upsert_statement(insert, user_id: int, product_id: int, quantity: int):
+    """Build cart upsert for dialect specific insert, new line is selected from products."""
+    products = models.Product.__table__
+    source = select(literal(user_id), products.c.id, products.c.title, products.c.product_type, literal(quantity),
+                    products.c.price, products.c.price * quantity).where(products.c.id == product_id)
+    return add_on_conflict(insert(models.MyCart.__table__).from_select(CART_COLUMNS, source))
+
+
+def check_batch(items, products, in_cart):
+    """
+    Decide outcome of every item of a batch add from one read of products and cart quantities. Items passing
+    are still to be reserved.
+    Parameters
+    ----------------------------------------------------------
+    items: dict - Quantity to add for every product id
+    products: dict - Product row, with available stock, of every existing product id
+    in_cart: dict - Quantity already in cart for every product id
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: tuple - dict of product id to status, list of (product, quantity) to write
+    """
+    results, accepted = {}, []
+    for product_id, quantity in items.items():
+        product = products.get(product_id)
+        if quantity < 1:
+            results[product_id] = 'invalid_quantity'
+        elif product is None:
+            results[product_id] = 'not_found'
+        elif quantity > product.available:
+            results[product_id] = 'stock_unavailable'
+        else:
+            results[product_id] = 'updated' if product_id in in_cart else 'added'
+            accepted.append((product, quantity))
+    return results, accepted
+
+
+def reserve_batch(db, user_id: int, results, accepted):
+    """Reserve stock of accepted items, items losing stock to other carts meanwhile become out_of_stock."""
+    reserved = reservations.reserve_many(db, user_id, {product.id: quantity for product, quantity in accepted})
+    for product, quantity in accepted:
+        if product.id not in reserved:
+            results[product.id] = 'out_of_stock'
+    return [(product, quantity) for product, quantity in accepted if product.id in reserved]
+
+
+class SqlCartStore:
+    """Cart lines as rows of my_cart table. Writes are committed by caller, clear too."""
+
+    clears_in_transaction = True
+
+    def items(self, db, user_id: int, for_update: bool = False):
+        """Return cart lines of user, locked until commit when for_update is set."""
+        query = db.query(models.MyCart).filter(models.MyCart.user_id == user_id).order_by(models.MyCart.id)
+        if for_update:
+            query = query.with_for_update()
+        return [schemas.MyCart.from_orm(line) for line in query]
+
+    def add(self, db, user_id: int, product_id: int, quantity: int):
+        """
+        Reserve quantity of product, add it to cart of user with one INSERT ... ON CONFLICT DO UPDATE and count
+        it in cart summary. Returns True if product was in cart already.
+        """
+        if not reservations.reserve(db, user_id, product_id, quantity):
+            raise stock_error(db, product_id, quantity)
+        if db.get_bind().dialect.name == 'postgresql':
+            row = db.execute(upsert_statement(postgresql.insert, user_id, product_id, quantity).returning(
+                literal_column('xmax') != 0)).first()
+            if row is None:
+                raise stock_error(db, product_id, quantity)
+            existed = row[0]
+        else:
+            existed = db.query(models.MyCart.id).filter(models.MyCart.user_id == user_id,
+                                                        models.MyCart.product_id == product_id).first() is not None
+            if not db.execute(upsert_statement(sqlite.insert, user_id, product_id, quantity)).rowcount:
+                raise stock_error(db, product_id, quantity)
+        cart_summary.apply_line_added(db, user_id, product_id, quantity, new_line=not existed)
+        return existed
+
+    def add_many(self, db, user_id: int, items):
+        """
+        Add many products with one read of products joined with cart lines, one reservation of stock and one
+        multi-row upsert. Returns status of every product id.
+        """
+        rows = db.query(models.Product.id, models.Product.title, models.Product.product_type, models.Product.price,
+                        models.Product.available, models.MyCart.product_quantity).outerjoin(
+            models.MyCart, and_(models.MyCart.product_id == models.Product.id, models.MyCart.user_id == user_id)
+        ).filter(models.Product.id.in_(list(items))).all()
+        results, accepted = check_batch(items, {row.id: row for row in rows},
+                                        {row.id: row.product_quantity for row in rows
+                                         if row.product_quantity is not None})
+        accepted = reserve_batch(db, user_id, results, accepted)
+        if not accepted:
+            return results
+
+        values = [{'user_id': user_id, 'product_id': product.id, 'product_name': product.title,
+                   'product_type': product.product_type, 'product_quantity': quantity,
+                   'product_price': product.price, 'total': product.price * quantity}
+                  for product, quantity in accepted]
+        db.execute(add_on_conflict(dialect_insert(db)(models.MyCart.__table__).values(values)))
+        cart_summary.apply_changes(db, user_id, [
+            (product.product_type, quantity, 1 if results[product.id] == 'added' else 0, product.price * quantity)
+            for product, quantity in accepted])
+        return results
+
+    def remove(self, db, user_id: int, product_id: int):
+        """Remove product from cart of user and release its reservation. Returns False if product was not in cart."""
+        reservations.release(db, user_id, product_id)
+        line = db.query(models.MyCart).filter(models.MyCart.user_id == user_id,
+                                              models.MyCart.product_id == product_id).with_for_update().first()
+        if line is None:
+            return False
+        db.delete(line)
+        cart_summary.apply_changes(db, user_id, [(line.product_type, -line.product_quantity, -1, -line.total)])
+        return True
+
+    def clear(self, db, user_id: int, lines=None):
+        """
+        Remove lines ordered from cart of user, in same transaction as the order placed from it. Lines added by
+        another request meanwhile stay in cart. Without lines every line is removed.
+        """
+        query = db.query(models.MyCart).filter(models.MyCart.user_id == user_id)
+        if lines is None:
+            query.delete()
+            cart_summary.clear(db, user_id)
+            return
+        removed = query.filter(models.MyCart.product_id.in_([line.product_id for line in lines])).all()
+        for line in removed:
+            db.delete(line)
+        cart_summary.apply_changes(db, user_id, [(line.product_type, -line.product_quantity, -1, -line.total)
+                                                 for line in removed])
+
+    def summary(self, db, user_id: int):
+        """Return item count, line count and subtotals of cart of user."""
+        return cart_summary.summary(db, user_id)
+
+    def commit(self, db):
+        """Commit cart write with the stock reservation behind it."""
+        db.commit()
+
+
+class RedisCartStore:
+    """
+    Cart lines in Redis hash cart:<user_id>. Every product has a <id>:qty counter, a <id>:total float and
+    <id>:info with name, type and price, so adding is atomic increments without read-modify-write. Summary
+    counters live in hash cart_summary:<user_id> and change in the same MULTI as the line. Redis writes can not
+    be rolled back with SQL, so pipelines adding to cart are queued on the session and applied by commit once
+    the reservation is saved, and checkout clears the cart only once the order is committed.
+    """
+
+    clears_in_transaction = False
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _key(user_id: int):
+        return f'cart:{user_id}'
+
+    @staticmethod
+    def _summary_key(user_id: int):
+        return f'cart_summary:{user_id}'
+
+    @staticmethod
+    def _fields(product_id: int):
+        return f'{product_id}:qty', f'{product_id}:total', f'{product_id}:info'
+
+    def _increment(self, pipe, user_id: int, product, quantity: int):
+        """Queue increments of line and summary counters, negative quantity takes them back."""
+        key, summary_key = self._key(user_id), self._summary_key(user_id)
+        amount = product.price * quantity
+        pipe.hincrby(key, f'{product.id}:qty', quantity)
+        pipe.hincrbyfloat(key, f'{product.id}:total', amount)
+        pipe.hincrby(summary_key, 'items', quantity)
+        pipe.hincrbyfloat(summary_key, 'subtotal', amount)
+        pipe.hincrbyfloat(summary_key, f'type:{product.product_type or ""}', amount)
+
+    def _info(self, product, added: float):
+        return json.dumps({'name': product.title, 'type': product.product_type, 'price': product.price,
+                           'added': added})
+
+    @staticmethod
+    def _defer(db, pipe):
+        db.info.setdefault(PENDING_WRITES, []).append(pipe)
+
+    def items(self, db, user_id: int, for_update: bool = False):
+        fields = {field.decode(): value for field, value in self.client.hgetall(self._key(user_id)).items()}
+        lines = []
+        for field, value in fields.items():
+            product_id, kind = field.split(':')
+            if kind != 'info' or f'{product_id}:qty' not in fields:
+                continue
+            info = json.loads(value)
+            lines.append((info['added'], int(product_id), schemas.MyCart(
+                product_id=int(product_id), product_name=info['name'], product_price=info['price'],
+                product_quantity=int(fields[f'{product_id}:qty']), total=float(fields[f'{product_id}:total']))))
+        return [line for added, product_id, line in sorted(lines, key=lambda line: line[:2])]
+
+    def add(self, db, user_id: int, product_id: int, quantity: int):
+        """
+        Reserve quantity of product in SQL and queue one pipeline adding it to line and summary, applied by
+        commit. Returns True if product was in cart already.
+        """
+        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        if not product or not reservations.reserve(db, user_id, product_id, quantity):
+            raise stock_error(db, product_id, quantity)
+        existed = self.client.hexists(self._key(user_id), f'{product.id}:qty')
+        pipe = self.client.pipeline()
+        self._increment(pipe, user_id, product, quantity)
+        pipe.hsetnx(self._key(user_id), f'{product.id}:info', self._info(product, time.time()))
+        self._defer(db, pipe)
+        return bool(existed)
+
+    def add_many(self, db, user_id: int, items):
+        """
+        Add many products with one read of products, one HMGET of cart quantities, one reservation of stock
+        and one pipeline, applied by commit.
+        """
+        key = self._key(user_id)
+        products = {product.id: product for product in db.query(
+            models.Product.id, models.Product.title, models.Product.product_type, models.Product.price,
+            models.Product.available).filter(models.Product.id.in_(list(items)))}
+        product_ids = list(items)
+        quantities = self.client.hmget(key, [f'{product_id}:qty' for product_id in product_ids])
+        results, accepted = check_batch(items, products, {product_id: int(quantity) for product_id, quantity
+                                                          in zip(product_ids, quantities) if quantity is not None})
+        accepted = reserve_batch(db, user_id, results, accepted)
+        if not accepted:
+            return results
+
+        added = time.time()
+        pipe = self.client.pipeline()
+        for product, quantity in accepted:
+            self._increment(pipe, user_id, product, quantity)
+            pipe.hsetnx(key, f'{product.id}:info', self._info(product, added))
+        self._defer(db, pipe)
+        return results
+
+    def remove(self, db, user_id: int, product_id: int):
+        """Release reservation, remove line and take its counts out of summary, retried if line changes meanwhile."""
+        reservations.release(db, user_id, product_id)
+        key, summary_key = self._key(user_id), self._summary_key(user_id)
+        fields = self._fields(product_id)
+
+        def remove_line(pipe):
+            quantity, total, info = pipe.hmget(key, fields)
+            if quantity is None:
+                return False
+            product_type = json.loads(info).get('type') if info else None
+            pipe.multi()
+            pipe.hdel(key, *fields)
+            pipe.hincrby(summary_key, 'items', -int(quantity))
+            pipe.hincrbyfloat(summary_key, 'subtotal', -float(total))
+            pipe.hincrbyfloat(summary_key, f'type:{product_type or ""}', -float(total))
+            return True
+
+        return self.client.transaction(remove_line, key, value_from_callable=True)
+
+    def clear(self, db, user_id: int, lines=None):
+        """
+        Take quantities ordered out of cart lines with one transaction, retried if cart changes meanwhile.
+        Quantity added to a line after the order was read stays in cart. Without lines cart is deleted.
+        """
+        key, summary_key = self._key(user_id), self._summary_key(user_id)
+        if lines is None:
+            self.client.delete(key, summary_key)
+            return
+
+        def clear_lines(pipe):
+            current = [pipe.hmget(key, self._fields(line.product_id)) for line in lines]
+            pipe.multi()
+            for line, (quantity, total, info) in zip(lines, current):
+                if quantity is None:
+                    continue
+                if int(quantity) > line.product_quantity:
+                    quantity, total = line.product_quantity, line.total
+                    pipe.hincrby(key, f'{line.product_id}:qty', -quantity)
+                    pipe.hincrbyfloat(key, f'{line.product_id}:total', -total)
+                else:
+                    pipe.hdel(key, *self._fields(line.product_id))
+                product_type = json.loads(info).get('type') if info else None
+                pipe.hincrby(summary_key, 'items', -int(quantity))
+                pipe.hincrbyfloat(summary_key, 'subtotal', -float(total))
+                pipe.hincrbyfloat(summary_key, f'type:{product_type or ""}', -float(total))
+
+        self.client.transaction(clear_lines, key)
+
+    def commit(self, db):
+        """
+        Commit SQL transaction, then apply cart pipelines queued in it. Nothing reaches Redis if commit fails,
+        and a Redis failure afterwards leaves stock reserved until the sweeper releases it, never a cart line
+        without reservation behind it.
+        """
+        pipes = db.info.pop(PENDING_WRITES, [])
+        db.commit()
+        for pipe in pipes:
+            pipe.execute()
+
+    def summary(self, db, user_id: int):
+        pipe = self.client.pipeline()
+        pipe.hgetall(self._summary_key(user_id))
+        pipe.hlen(self._key(user_id))
+        counters, fields = pipe.execute()
+        counters = {field.decode(): value for field, value in counters.items()}
+        return cart_summary.build_summary(
+            int(counters.get('items', 0)), fields // 3, float(counters.get('subtotal', 0)),
+            {field[len('type:'):]: float(value) for field, value in counters.items() if field.startswith('type:')})
+
+
+def redis_client(url: str):
+    """Redis client for url, fakeredis:// gives an in-process fake server for local runs and tests."""
+    if url.startswith('fakeredis://'):
+        import fakeredis
+        return fakeredis.FakeRedis()
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def build_store(backend: str = CART_BACKEND, url: str = REDIS_URL):
+    if backend == 'redis':
+        return RedisCartStore(redis_client(url))
+    return SqlCartStore()
+
+
+carts = build_store()
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from sqlalchemy import select, literal, func
+from .. import models, schemas
+from .dialect import dialect_insert
+
+"""
+Cart Summary per user: item count, line count, subtotal and subtotal of every product type. Rows of
+cart_summary (one per user and product type) are changed by deltas in the same transaction as the cart
+lines, so cart badge and checkout read a few summary rows instead of scanning the cart.
+"""
+
+SUMMARY_COLUMNS = ['user_id', 'product_type', 'item_count', 'line_count', 'subtotal']
+
+
+def add_deltas(statement):
+    """Add inserted counts to existing summary row of same user and product type."""
+    table = models.CartSummary.__table__
+    return statement.on_conflict_do_update(
+        index_elements=['user_id', 'product_type'],
+        set_={column: table.c[column] + statement.excluded[column]
+              for column in ('item_count', 'line_count', 'subtotal')})
+
+
+def apply_line_added(db, user_id: int, product_id: int, quantity: int, new_line: bool):
+    """Count quantity of product just added to cart line of user, at current product price."""
+    cart = models.MyCart.__table__
+    products = models.Product.__table__
+    source = select(literal(user_id), func.coalesce(cart.c.product_type, ''), literal(quantity),
+                    literal(1 if new_line else 0), products.c.price * quantity).select_from(
+        cart.join(products, products.c.id == cart.c.product_id)).where(
+        cart.c.user_id == user_id, cart.c.product_id == product_id)
+    db.execute(add_deltas(dialect_insert(db)(models.CartSummary.__table__).from_select(SUMMARY_COLUMNS, source)))
+
+
+def apply_changes(db, user_id: int, changes):
+    """
+    Apply deltas to summary of user. Caller commits with the cart write.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    user_id: int - Owner of the cart
+    changes: list - (product_type, item delta, line delta, subtotal delta) of every changed cart line
+    ----------------------------------------------------------
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for product_type, items, lines, subtotal in changes:
+        delta = deltas[product_type or '']
+        delta[0] += items
+        delta[1] += lines
+        delta[2] += subtotal
+    if not deltas:
+        return
+    db.execute(add_deltas(dialect_insert(db)(models.CartSummary.__table__).values([
+        {'user_id': user_id, 'product_type': product_type, 'item_count': items, 'line_count': lines,
+         'subtotal': subtotal} for product_type, (items, lines, subtotal) in deltas.items()])))
+
+
+def clear(db, user_id: int):
+    db.query(models.CartSummary).filter(models.CartSummary.user_id == user_id).delete(synchronize_session=False)
+
+
+def build_summary(item_count, line_count, subtotal, product_types):
+    """Summary schema with float sums rounded to paise and empty product types left out."""
+    return schemas.CartSummary(item_count=item_count, line_count=line_count, subtotal=round(subtotal, 2),
+                               product_types={product_type: round(amount, 2)
+                                              for product_type, amount in product_types.items()
+                                              if round(amount, 2)})
+
+
+def summary(db, user_id: int):
+    """Read summary of user from its summary rows."""
+    rows = db.query(models.CartSummary).filter(models.CartSummary.user_id == user_id,
+                                               models.CartSummary.line_count > 0).all()
+    return build_summary(sum(row.item_count for row in rows), sum(row.line_count for row in rows),
+                         sum(row.subtotal for row in rows), {row.product_type: row.subtotal for row in rows})
+
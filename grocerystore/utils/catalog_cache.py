@@ -0,0 +1,96 @@
+import os
+import threading
+from dotenv import load_dotenv
+from .lru_cache import LRUCache
+from .cache_version import version_tracker, PRODUCTS
+
+load_dotenv()
+
+"""
+Read-Through Cache of Product Catalog. Entries belong to one catalog version, admin product writes bump the
+version so this worker drops the cache at once and other workers drop it on their next version check.
+Stock quantity changes made by checkout do not bump the version, so they show up after the TTL at most.
+"""
+
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 1024))
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 60))
+
+_MISSING = object()
+
+
+class CatalogCache:
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self._cache = LRUCache(max_size, ttl)
+        self._version = None
+        self._generation = 0
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, db, key, loader):
+        """
+        Return cached value of key, calling loader to fill it on miss.
+        Parameters
+        ----------------------------------------------------------
+        db: Database Object - Used only when version check is due
+        key: tuple - Identifies the query and its arguments
+        loader: function - Returns fresh value from database
+        ----------------------------------------------------------
+
+        Returns
+        ----------------------------------------------------------
+        response: object - Cached or freshly loaded value
+        """
+        generation = self._check_version(db)
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._cache.set(key, value)
+        return value
+
+    def get_index(self, db, key):
+        """
+        Return {id: item} index of cached list of key, built once per cached list and kept outside the LRU
+        entries. None if list of key is not cached for current version.
+        """
+        self._check_version(db)
+        items = self._cache.peek(key)
+        if items is None:
+            return None
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None and cached[0] is items:
+                return cached[1]
+        index = {item.id: item for item in items}
+        with self._lock:
+            self._indexes[key] = (items, index)
+        return index
+
+    def _check_version(self, db):
+        """Drop entries of older catalog version and return current generation of cache."""
+        version = version_tracker.get(db, self.name)
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._indexes.clear()
+                self._version = version
+                self._generation += 1
+            return self._generation
+
+    def invalidate(self):
+        """Drop all entries after a write so that next read loads fresh data and version."""
+        version_tracker.expire(self.name)
+        with self._lock:
+            self._cache.clear()
+            self._indexes.clear()
+            self._version = None
+            self._generation += 1
+
+    def stats(self):
+        """Return hit/miss counters and version of cache."""
+        return dict(self._cache.stats(), version=self._version)
+
+
+catalog = CatalogCache(PRODUCTS, CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL)
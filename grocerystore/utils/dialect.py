@@ -0,0 +1,11 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+"""
+Dialect Helpers. Upserts are written with ON CONFLICT, which Postgres and SQLite both support through their
+own insert constructs.
+"""
+
+
+def dialect_insert(db):
+    """Insert construct supporting ON CONFLICT for the database in use."""
+    return postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
@@ -0,0 +1,48 @@
+import hashlib
+from fastapi import Response
+from .cache_version import version_tracker
+
+"""
+Conditional Responses for cached listings. ETag is built from version counter of the listed table and the
+requested url, so a client sending matching If-None-Match gets 304 without any rows being queried.
+"""
+
+
+def make_etag(name: str, version: int, request):
+    """Strong ETag of the listing for current table version and query parameters."""
+    query = '&'.join(sorted(f'{key}={value}' for key, value in request.query_params.multi_items()))
+    digest = hashlib.sha1(f'{request.url.path}?{query}'.encode()).hexdigest()[:16]
+    return f'"{name}-{version}-{digest}"'
+
+
+def etag_matches(request, etag: str):
+    """Check If-None-Match header of request against the ETag."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in tags or f'W/{etag}' in tags
+
+
+def conditional_response(request, response, db, name: str):
+    """
+    Set ETag header on response and return 304 Response if client already has this version.
+    Parameters
+    ----------------------------------------------------------
+    request: Request - Incoming request with If-None-Match header
+    response: Response - Outgoing response to attach ETag
+    db: Database Object - Used only when version check is due
+    name: str - Name of version counter of the listed table
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: Response - 304 Not Modified, or None when body has to be sent
+    """
+    etag = make_etag(name, version_tracker.get(db, name), request)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+    return None
@@ -0,0 +1,117 @@
+from collections import Counter
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func, insert, or_, select
+from ..repository import messages
+from .. import models
+from .dialect import dialect_insert
+
+"""
+Facet Counts of Product Catalog by product type and price bucket. Counts are kept in product_facets table and
+updated by admin product writes in the same transaction, so browse requests read a handful of aggregate rows
+instead of grouping the whole products table.
+"""
+
+PRICE_BUCKETS = [(0, 50), (50, 100), (100, 250), (250, 500), (500, 1000), (1000, None)]
+
+
+def bucket_label(lower, upper):
+    """Display label of price bucket, like 50-100 or 1000+."""
+    return f'{lower}+' if upper is None else f'{lower}-{upper}'
+
+
+BUCKET_LABELS = [bucket_label(lower, upper) for lower, upper in PRICE_BUCKETS]
+
+
+def price_bucket(price: float):
+    """Return label of bucket the price falls in, lower bound inclusive."""
+    for lower, upper in PRICE_BUCKETS:
+        if upper is None or price < upper:
+            return bucket_label(lower, upper)
+
+
+def bucket_expression():
+    """SQL expression computing price bucket label of a product."""
+    return case(*[(models.Product.price < upper, bucket_label(lower, upper))
+                  for lower, upper in PRICE_BUCKETS if upper is not None],
+                else_=bucket_label(*PRICE_BUCKETS[-1]))
+
+
+def bucket_filter(labels):
+    """SQL condition matching products in any of the price buckets."""
+    conditions = []
+    for label in labels:
+        if label not in BUCKET_LABELS:
+            raise HTTPException(status_code=400, detail=messages.Invalid_Price_Bucket_400(BUCKET_LABELS))
+        lower, upper = PRICE_BUCKETS[BUCKET_LABELS.index(label)]
+        if upper is None:
+            conditions.append(models.Product.price >= lower)
+        elif lower == 0:
+            conditions.append(models.Product.price < upper)
+        else:
+            conditions.append(and_(models.Product.price >= lower, models.Product.price < upper))
+    return or_(*conditions)
+
+
+def apply_changes(db, removed=(), added=()):
+    """
+    Update facet counts for removed and added products with one INSERT ... ON CONFLICT DO UPDATE, so writers
+    creating the same facet row at once add up instead of failing. Caller commits with the product write.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    removed: list - (product_type, price) of products deleted or before update
+    added: list - (product_type, price) of products added or after update
+    ----------------------------------------------------------
+    """
+    deltas = Counter()
+    for product_type, price in removed:
+        deltas[(product_type or '', price_bucket(price))] -= 1
+    for product_type, price in added:
+        deltas[(product_type or '', price_bucket(price))] += 1
+
+    rows = [{'product_type': product_type, 'price_bucket': bucket, 'product_count': delta}
+            for (product_type, bucket), delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = models.ProductFacet.__table__
+    statement = dialect_insert(db)(table).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['product_type', 'price_bucket'],
+        set_={'product_count': table.c.product_count + statement.excluded.product_count}))
+
+
+def rebuild(db):
+    """Recompute all facet counts from products table, used after bulk imports and updates."""
+    product_type = func.coalesce(models.Product.product_type, '')
+    bucket = bucket_expression()
+    grouped = select(product_type, bucket, func.count(models.Product.id)).group_by(product_type, bucket)
+    db.query(models.ProductFacet).delete(synchronize_session=False)
+    db.execute(insert(models.ProductFacet.__table__).from_select(
+        ['product_type', 'price_bucket', 'product_count'], grouped))
+
+
+def facet_counts(db, product_types, price_buckets):
+    """
+    Count products per type and per price bucket. Each facet is counted with filters of the other facet,
+    so the client can see how many products it gets by changing its selection.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    product_types: list - Selected product types
+    price_buckets: list - Selected price buckets
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: dict - Product count per product type and per price bucket
+    """
+    types, buckets = Counter(), Counter()
+    for row in db.query(models.ProductFacet).filter(models.ProductFacet.product_count > 0):
+        if not price_buckets or row.price_bucket in price_buckets:
+            types[row.product_type] += row.product_count
+        if not product_types or row.product_type in product_types:
+            buckets[row.price_bucket] += row.product_count
+    return {
+        'product_type': dict(sorted(types.items())),
+        'price_bucket': {label: buckets[label] for label in BUCKET_LABELS if buckets[label]},
+    }
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+Thread-Safe LRU Cache with expiry of entries. Shared by every in-process cache of the project so each of
+them is bounded in size and reports hit/miss counters the same way.
+"""
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float = None):
+        """
+        Parameters
+        ----------------------------------------------------------
+        max_size: int - Maximum number of entries kept, least recently used entry gets evicted first
+        ttl: float - Default life of entry in seconds, None keeps it until evicted
+        ----------------------------------------------------------
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return value of key if present and not expired, otherwise default."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Return value of key without touching counters or recency."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+                return default
+            return entry[0]
+
+    def set(self, key, value, expires_at: float = None):
+        """Store value under key until expires_at (epoch seconds) or default ttl."""
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove key from cache and return its value."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        """Remove every entry from cache, counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return counters of cache for monitoring purpose."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -0,0 +1,71 @@
+import csv
+import datetime
+import io
+import json
+from .. import models
+
+"""
+Streaming Export of Orders. Rows are read through a server-side cursor as plain column tuples (not tracked by
+session) and written out in chunks, so memory stays constant no matter how many orders are exported.
+"""
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_COLUMNS = ['id', 'user_id', 'shipping_id', 'description', 'payment_id', 'product_name', 'total_amount',
+                  'payment_status', 'order_status', 'coupon_used', 'created_at']
+EXPORT_CHUNK_ROWS = 1000
+
+
+def orders_query(db, order_status=None, user_id=None, date_from=None, date_to=None):
+    """Build streamed query of order columns with optional filters, date_to is inclusive."""
+    columns = [getattr(models.OrderDetails, name) for name in EXPORT_COLUMNS]
+    query = db.query(*columns)
+    if order_status:
+        query = query.filter(models.OrderDetails.order_status == order_status)
+    if user_id is not None:
+        query = query.filter(models.OrderDetails.user_id == user_id)
+    if date_from:
+        query = query.filter(models.OrderDetails.created_at >= date_from)
+    if date_to:
+        query = query.filter(models.OrderDetails.created_at < date_to + datetime.timedelta(days=1))
+    return query.order_by(models.OrderDetails.id).yield_per(EXPORT_CHUNK_ROWS)
+
+
+def to_json_value(value):
+    """Convert dates to ISO format for NDJSON lines."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def stream_orders(query, file_format: str):
+    """
+    Yield exported orders in chunks of text.
+    Parameters
+    ----------------------------------------------------------
+    query: Query Object - Streamed query from orders_query
+    file_format: str - csv | ndjson
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: iterator - Chunks of CSV or NDJSON text
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if file_format == 'csv':
+        writer.writerow(EXPORT_COLUMNS)
+
+    count = 0
+    for row in query:
+        if file_format == 'csv':
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps({name: to_json_value(value) for name, value in zip(EXPORT_COLUMNS, row)}))
+            buffer.write('\n')
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -1,21 +1,54 @@
 import datetime
-from sqlalchemy import distinct, func, and_
+import os
+from sqlalchemy import distinct, and_
 from fastapi import HTTPException
+from dotenv import load_dotenv
 from ..repository import messages
 from .. import models
+from .dialect import dialect_insert
 
+load_dotenv()
 
-def check_cart(db, user_id):
+CHECKOUT_LOCK_SECONDS = int(os.environ.get('CHECKOUT_LOCK_SECONDS', 120))
+
+
+def claim_checkout(db, user_id):
+    """
+    Let one checkout of User run at a time. Lock left behind by a checkout that never finished is taken over
+    after CHECKOUT_LOCK_SECONDS. Caller commits so other checkouts see the lock.
+    """
+    now = datetime.datetime.utcnow()
+    table = models.CheckoutLock.__table__
+    statement = dialect_insert(db)(table).values(
+        user_id=user_id, locked_until=now + datetime.timedelta(seconds=CHECKOUT_LOCK_SECONDS))
+    if not db.execute(statement.on_conflict_do_update(
+            index_elements=['user_id'], set_={'locked_until': statement.excluded.locked_until},
+            where=table.c.locked_until < now)).rowcount:
+        raise HTTPException(status_code=409, detail=messages.CHECKOUT_IN_PROGRESS_409)
+
+
+def release_checkout(db, user_id):
+    """Remove checkout lock of User, with the order written or after the checkout failed."""
+    db.query(models.CheckoutLock).filter(models.CheckoutLock.user_id == user_id).delete(synchronize_session=False)
+
+
+def check_cart_unchanged(ordered, current):
+    """Check Cart still holds the lines the amount was worked out from, before Order is written."""
+    if sorted((item.product_id, item.product_quantity) for item in ordered) != \
+            sorted((item.product_id, item.product_quantity) for item in current):
+        raise HTTPException(status_code=409, detail=messages.CART_CHANGED_409)
+
+
+def check_cart(cart_items):
     """Check User has Items in their Cart before Proceed."""
-    check_cart_existence = db.query(models.MyCart).filter(models.MyCart.user_id == user_id[0]).all()
-    if not check_cart_existence:
+    if not cart_items:
         raise HTTPException(status_code=404, detail=messages.CART_EMPTY_404)
-    return check_cart_existence
+    return cart_items
 
 
 def shipment_info(request, db, user_id):
     """Check User has added their Shipping Information."""
-    shipping_info = db.query(models.ShippingInfo).filter(and_(models.ShippingInfo.user_id == user_id[0], models.ShippingInfo.id == request.shipping_id)).first()
+    shipping_info = db.query(models.ShippingInfo).filter(and_(models.ShippingInfo.user_id == user_id, models.ShippingInfo.id == request.shipping_id)).first()
     if not shipping_info:
         raise HTTPException(status_code=404, detail=messages.SHIPPING_UNAVAILABLE_404)
     return shipping_info
@@ -35,11 +68,10 @@ def coupon_code_validation(db, user_id, request):
             raise HTTPException(status_code=401, detail=messages.COUPON_EXPIRED_404)
         coupon_discount = getattr(coupon_code, "discount_percentage")
         coupon_using = getattr(coupon_code, "id")
-        coupon_code.times_used = getattr(coupon_code, "times_used") + 1
 
         """Check Coupon used once or not"""
         order_details = db.query(distinct(models.OrderDetails.coupon_used)).filter(
-            models.OrderDetails.user_id == user_id[0])
+            models.OrderDetails.user_id == user_id)
         for i in order_details:
             if coupon_using == i[0]:
                 raise HTTPException(status_code=401, detail=messages.USED_COUPON_401)
@@ -47,33 +79,26 @@ def coupon_code_validation(db, user_id, request):
     return coupon_discount, coupon_using
 
 
-def order_amount(request, db, user_id, coupon_discount):
-    """Fetch the Total Amount Payable By User"""
-    total_amount = db.query(func.sum(models.MyCart.total)).filter(models.MyCart.user_id == user_id[0]).all()
+def use_coupon(db, coupon_using):
+    """Count one more use of Coupon Code along with the order placed"""
+    if coupon_using:
+        db.query(models.DiscountCoupon).filter(models.DiscountCoupon.id == coupon_using).update(
+            {models.DiscountCoupon.times_used: models.DiscountCoupon.times_used + 1}, synchronize_session=False)
 
-    if total_amount[0][0] < 100:
-        raise HTTPException(status_code=401, detail=messages.LOW_ORDER_AMOUNT.format(100 - total_amount[0][0]))
 
-    product_type = db.query(models.Product.product_type).filter(
-        and_(models.MyCart.product_id == models.Product.id, models.MyCart.user_id == user_id[0])).all()
+def order_amount(request, summary, coupon_discount):
+    """Fetch the Total Amount Payable By User from Cart Summary"""
+    total_amount = summary.subtotal
 
-    for i in product_type:
-        if request.coupon_code == "":
-            coupon_found = 1
-            break
-        elif request.coupon_code == i[0]:
-            coupon_found = 1
-            item_total_amount = db.query(func.sum(models.MyCart.total)).filter(
-                and_(models.MyCart.product_id == models.Product.id, models.MyCart.user_id == user_id[0],
-                     models.Product.product_type == request.coupon_code))
+    if total_amount < 100:
+        raise HTTPException(status_code=401, detail=messages.LOW_ORDER_AMOUNT.format(100 - total_amount))
 
-            total_amount = (total_amount[0][0] - ((item_total_amount[0][0] * coupon_discount) / 100))
-            return total_amount
-        else:
-            coupon_found = 0
+    if request.coupon_code == "":
+        return total_amount
 
-    if coupon_found == 0:
+    """Coupon applies to products of the type it is issued for"""
+    if request.coupon_code not in summary.product_types:
         raise HTTPException(status_code=404, detail=messages.INVALID_COUPON_404)
 
-    total_amount = (total_amount[0][0] - ((total_amount[0][0] * coupon_discount) / 100))
-    return total_amount
+    item_total_amount = summary.product_types[request.coupon_code]
+    return total_amount - ((item_total_amount * coupon_discount) / 100)
@@ -0,0 +1,85 @@
+import base64
+import json
+from sqlalchemy import and_, or_, asc, desc
+from fastapi import HTTPException
+from ..repository import messages
+from .. import models
+
+"""
+Keyset (Cursor) Pagination for Products. Only page_size + 1 rows are fetched from the database for every
+page, and the position is carried forward in an opaque cursor built from the sort key and Product.id.
+"""
+
+PRODUCT_SORT_KEYS = {
+    'id': models.Product.id,
+    'price': models.Product.price,
+    'title': models.Product.title,
+}
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_by, sort_value, item_id):
+    """Encode last row of the page as an url-safe cursor."""
+    raw = json.dumps([sort_by, sort_value, item_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_by):
+    """Decode the cursor sent by client and make sure it belongs to the same sort key."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort_by, sort_value, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=messages.INVALID_CURSOR_400)
+    if cursor_sort_by != sort_by or not isinstance(item_id, int):
+        raise HTTPException(status_code=400, detail=messages.INVALID_CURSOR_400)
+    return sort_value, item_id
+
+
+def keyset_page(query, cursor=None, size=50, sort_by='id', descending=False):
+    """
+    Fetch one page of products after the cursor position.
+    Parameters
+    ----------------------------------------------------------
+    query: Query Object - Product query with all filters applied
+    cursor: str - Opaque cursor returned with previous page
+    size: int - Number of items per page
+    sort_by: str - Sort key, one of id | price | title
+    descending: bool - Sort Order
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: dict - Items of the page, page size and cursor of next page
+    """
+    if sort_by not in PRODUCT_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=messages.INVALID_SORT_KEY_400)
+    if size < 1 or size > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=messages.Invalid_Page_Size_400(MAX_PAGE_SIZE))
+
+    sort_column = PRODUCT_SORT_KEYS[sort_by]
+    id_column = models.Product.id
+    direction = desc if descending else asc
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_by)
+        if sort_by == 'id':
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > last_id)))
+
+    if sort_by == 'id':
+        query = query.order_by(direction(id_column))
+    else:
+        query = query.order_by(direction(sort_column), direction(id_column))
+
+    rows = query.limit(size + 1).all()
+    items = rows[:size]
+    next_cursor = None
+    if len(rows) > size:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_by, getattr(last, sort_by), getattr(last, 'id'))
+
+    return {'items': items, 'size': size, 'next_cursor': next_cursor}
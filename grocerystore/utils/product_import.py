@@ -0,0 +1,220 @@
+import codecs
+import csv
+import io
+import json
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, update
+from ..repository import messages
+from .. import models, schemas
+
+"""
+Streaming Bulk Import of Products. Request body is read chunk by chunk as CSV (with header row) or NDJSON,
+validated row by row and written in batches. Postgres batches are loaded with COPY into a temporary table and
+upserted with one INSERT ... SELECT, other databases use executemany inserts/updates.
+"""
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+CONFLICT_POLICIES = ('skip', 'update')
+IMPORT_FIELDS = ['image_file', 'product_type', 'title', 'description', 'price', 'quantity']
+REQUIRED_FIELDS = ['title', 'description', 'price', 'quantity']
+
+
+async def iter_lines(stream):
+    """Decode byte chunks of request body and yield complete lines."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending.rstrip('\r')
+
+
+async def iter_csv_records(stream):
+    """Yield parsed CSV records, joining lines while a quoted field is still open."""
+    pending = None
+    async for line in iter_lines(stream):
+        pending = line if pending is None else pending + '\n' + line
+        if pending.count('"') % 2 == 0:
+            yield next(csv.reader([pending]), [])
+            pending = None
+    if pending is not None:
+        yield next(csv.reader([pending]), [])
+
+
+async def iter_rows(stream, file_format):
+    """Yield (row number, data, error) of every non-empty row in the body."""
+    number = 0
+    if file_format == 'ndjson':
+        async for line in iter_lines(stream):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield number, None, messages.INVALID_JSON_ROW
+                continue
+            if not isinstance(data, dict):
+                yield number, None, messages.INVALID_JSON_ROW
+                continue
+            yield number, data, None
+        return
+
+    header = None
+    async for record in iter_csv_records(stream):
+        if not any(field.strip() for field in record):
+            continue
+        if header is None:
+            header = [field.strip() for field in record]
+            continue
+        number += 1
+        if len(record) != len(header):
+            yield number, None, messages.Csv_Columns_Mismatch(len(header), len(record))
+            continue
+        yield number, dict(zip(header, record)), None
+
+
+def validate_row(data: dict):
+    """Validate one imported row against Product schema. Returns (row, error)."""
+    values = {key: value for key, value in data.items() if key in IMPORT_FIELDS and value not in (None, '')}
+    missing = [field for field in REQUIRED_FIELDS if field not in values]
+    if missing:
+        return None, messages.Missing_Fields(missing)
+    try:
+        product = schemas.ProductBase(**values)
+    except ValidationError as ex:
+        return None, '; '.join(f"{error['loc'][0]}: {error['msg']}" for error in ex.errors())
+    return product.dict(), None
+
+
+async def read_batches(stream, file_format: str, batch_size: int):
+    """
+    Read request body and yield valid rows in batches along with errors of invalid rows.
+    Parameters
+    ----------------------------------------------------------
+    stream: async iterator - Request body chunks
+    file_format: str - csv | ndjson
+    batch_size: int - Maximum rows yielded at once
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: async iterator - (list of (row number, row), list of row errors)
+    """
+    batch, errors = [], []
+    async for number, data, error in iter_rows(stream, file_format):
+        row = None
+        if error is None:
+            row, error = validate_row(data)
+        if error:
+            errors.append({'row': number, 'error': error})
+        else:
+            batch.append((number, row))
+        if len(batch) >= batch_size:
+            yield batch, errors
+            batch, errors = [], []
+    if batch or errors:
+        yield batch, errors
+
+
+def dedupe_batch(batch, on_conflict):
+    """
+    Keep one row per description within batch. First row wins when skipping conflicts, last row wins when
+    updating, as if rows were applied one after another. Returns (rows, skipped row numbers).
+    """
+    kept = {}
+    skipped = []
+    for number, row in batch:
+        previous = kept.get(row['description'])
+        if previous is None:
+            kept[row['description']] = (number, row)
+        elif on_conflict == 'update':
+            skipped.append(previous[0])
+            kept[row['description']] = (number, row)
+        else:
+            skipped.append(number)
+    return list(kept.values()), skipped
+
+
+def copy_batch(db, rows, on_conflict):
+    """Postgres: COPY rows into temporary table and upsert them into products with one statement."""
+    cursor = db.connection().connection.cursor()
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS products_import ("
+        "image_file varchar(255), product_type varchar(255), title varchar(255), "
+        "description varchar(255), price float, quantity integer) ON COMMIT DELETE ROWS")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for number, row in rows:
+        writer.writerow([row[field] for field in IMPORT_FIELDS])
+    buffer.seek(0)
+    columns = ', '.join(IMPORT_FIELDS)
+    cursor.copy_expert(f"COPY products_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    if on_conflict == 'update':
+        action = 'DO UPDATE SET ' + ', '.join(f'{field} = EXCLUDED.{field}' for field in IMPORT_FIELDS
+                                              if field != 'description')
+    else:
+        action = 'DO NOTHING'
+    cursor.execute(
+        f"INSERT INTO products ({columns}) SELECT {columns} FROM products_import "
+        f"ON CONFLICT (description) {action} RETURNING description, (xmax = 0) AS inserted")
+    written = dict(cursor.fetchall())
+    cursor.execute("TRUNCATE products_import")
+    cursor.close()
+
+    inserted = sum(1 for is_new in written.values() if is_new)
+    skipped = [number for number, row in rows if row['description'] not in written]
+    return inserted, len(written) - inserted, skipped
+
+
+def executemany_batch(db, rows, on_conflict):
+    """Other databases: find existing descriptions once, then executemany inserts and updates."""
+    table = models.Product.__table__
+    descriptions = [row['description'] for number, row in rows]
+    existing = {description for description, in db.query(models.Product.description).filter(
+        models.Product.description.in_(descriptions))}
+
+    new_rows = [row for number, row in rows if row['description'] not in existing]
+    if new_rows:
+        db.execute(insert(table), new_rows)
+
+    updated, skipped = 0, []
+    if on_conflict == 'update':
+        changed = [{'b_' + field: row[field] for field in IMPORT_FIELDS}
+                   for number, row in rows if row['description'] in existing]
+        if changed:
+            db.execute(update(table).where(table.c.description == bindparam('b_description')).values(
+                {field: bindparam('b_' + field) for field in IMPORT_FIELDS if field != 'description'}), changed)
+            updated = len(changed)
+    else:
+        skipped = [number for number, row in rows if row['description'] in existing]
+    return len(new_rows), updated, skipped
+
+
+def write_batch(db, batch, on_conflict):
+    """
+    Write one batch of valid rows as per conflict policy. Caller commits.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    batch: list - (row number, row) tuples of validated rows
+    on_conflict: str - skip | update rows whose description exists already
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: tuple - inserted count, updated count, skipped row numbers
+    """
+    rows, skipped = dedupe_batch(batch, on_conflict)
+    if db.get_bind().dialect.name == 'postgresql':
+        inserted, updated, conflicts = copy_batch(db, rows, on_conflict)
+    else:
+        inserted, updated, conflicts = executemany_batch(db, rows, on_conflict)
+    return inserted, updated, sorted(skipped + conflicts)
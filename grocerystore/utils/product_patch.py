@@ -0,0 +1,62 @@
+from sqlalchemy import bindparam, column, update, values
+from .. import models
+
+"""
+Set-Based Partial Update of Products. Patches with the same set of changed columns are written together with
+one UPDATE ... FROM (VALUES ...) statement in Postgres, or one executemany UPDATE elsewhere. Only the columns
+present in a patch are written.
+"""
+
+PATCH_FIELDS = ['image_file', 'product_type', 'title', 'description', 'price', 'quantity']
+
+
+def merge_patches(patches):
+    """Merge patches of same product id in request order and keep only fields that were sent."""
+    merged = {}
+    for patch in patches:
+        changes = {field: value for field, value in patch.dict(exclude_unset=True).items()
+                   if field in PATCH_FIELDS and value is not None}
+        merged.setdefault(patch.id, {}).update(changes)
+    return merged
+
+
+def group_by_columns(changes: dict):
+    """Group product ids by the tuple of columns they change."""
+    groups = {}
+    for item_id, fields in changes.items():
+        columns = tuple(field for field in PATCH_FIELDS if field in fields)
+        groups.setdefault(columns, []).append(item_id)
+    return groups
+
+
+def update_group(db, columns, item_ids, changes):
+    """
+    Update one group of products that change the same columns. Caller commits.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    columns: tuple - Names of changed columns
+    item_ids: list - Product IDs of the group
+    changes: dict - Changed fields of every product id
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: set - Product IDs found and updated
+    """
+    table = models.Product.__table__
+    if db.get_bind().dialect.name == 'postgresql':
+        rows = values(column('id', table.c.id.type), *[column(name, table.c[name].type) for name in columns],
+                      name='v').data([tuple([item_id] + [changes[item_id][name] for name in columns])
+                                      for item_id in item_ids])
+        result = db.execute(update(table).where(table.c.id == rows.c.id).values(
+            {name: rows.c[name] for name in columns}).returning(table.c.id))
+        return {item_id for item_id, in result}
+
+    found = {item_id for item_id, in db.query(models.Product.id).filter(models.Product.id.in_(item_ids))}
+    params = [dict({'b_id': item_id}, **{'b_' + name: changes[item_id][name] for name in columns})
+              for item_id in item_ids if item_id in found]
+    if params:
+        db.execute(update(table).where(table.c.id == bindparam('b_id')).values(
+            {name: bindparam('b_' + name) for name in columns}), params)
+    return found
@@ -0,0 +1,55 @@
+from sqlalchemy import and_, asc, case, func
+from fastapi import HTTPException
+from ..repository import messages
+from .. import models
+
+"""
+Product Search by Name and Price. Title matching is case-insensitive and matches anywhere in the title, which is
+served by the trigram index on lower(title) in Postgres. Exact titles rank first, then titles starting with
+the searched name, then the remaining matches.
+"""
+
+MAX_SEARCH_LIMIT = 100
+
+
+def like_pattern(term: str):
+    """Escape LIKE wildcards typed by user so that they are matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_products(db, name: str, min_price: float, max_price: float, limit: int, offset: int):
+    """
+    Search Products whose title contains the name within the price range.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    name: str - Full or partial name of product
+    min_price: float - Minimum Price tag to start with
+    max_price: float - Maximum price tag to filter within
+    limit: int - Number of Products to return
+    offset: int - Number of Products to skip
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: list - Matching Products ordered by relevance
+    """
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise HTTPException(status_code=400, detail=messages.Invalid_Page_Size_400(MAX_SEARCH_LIMIT))
+    if offset < 0:
+        raise HTTPException(status_code=400, detail=messages.INVALID_OFFSET_400)
+
+    query = db.query(models.Product).filter(
+        and_(models.Product.price > min_price, models.Product.price < max_price))
+
+    term = (name or '').strip().lower()
+    if not term:
+        query = query.order_by(asc(models.Product.id))
+    else:
+        title = func.lower(models.Product.title)
+        escaped = like_pattern(term)
+        relevance = case((title == term, 0), (title.like(escaped + '%', escape='\\'), 1), else_=2)
+        query = query.filter(title.like('%' + escaped + '%', escape='\\')).order_by(
+            relevance, func.length(models.Product.title), asc(models.Product.id))
+
+    return query.offset(offset).limit(limit).all()
@@ -0,0 +1,231 @@
+import datetime
+import os
+from collections import defaultdict
+from fastapi import HTTPException, status
+from sqlalchemy import update, values, column, bindparam, or_
+from dotenv import load_dotenv
+from ..repository import messages
+from .. import models
+from .dialect import dialect_insert
+
+load_dotenv()
+
+"""
+Stock Reservations. Adding to cart holds the quantity against products.reserved_quantity with one
+conditional UPDATE, so available stock (quantity - reserved_quantity) can never be oversold by carts.
+Every cart write extends reservations of that user, the sweeper releases reservations idle for longer than
+RESERVATION_TTL_MINUTES and checkout turns reservations into stock decrements.
+Locks are always taken on products rows first and on stock_reservations rows after, by cart writes,
+checkout and sweeper alike, so they never deadlock one another.
+"""
+
+RESERVATION_TTL_MINUTES = int(os.environ.get('RESERVATION_TTL_MINUTES', 15))
+
+
+def expiry_time():
+    return datetime.datetime.utcnow() + datetime.timedelta(minutes=RESERVATION_TTL_MINUTES)
+
+
+def lock_products(db, product_ids):
+    """Lock products rows in id order, which is the order every writer of reservations follows."""
+    if product_ids:
+        db.query(models.Product.id).filter(models.Product.id.in_(list(product_ids))).order_by(
+            models.Product.id).with_for_update().all()
+
+
+def hold(db, user_id: int, items):
+    """Add quantities to reservations of user and extend every reservation of user by TTL."""
+    table = models.StockReservation.__table__
+    expires_at = expiry_time()
+    statement = dialect_insert(db)(table).values([
+        {'user_id': user_id, 'product_id': product_id, 'quantity': quantity, 'expires_at': expires_at}
+        for product_id, quantity in items.items()])
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'product_id'],
+        set_={'quantity': table.c.quantity + statement.excluded.quantity, 'expires_at': expires_at}))
+    db.query(models.StockReservation).filter(models.StockReservation.user_id == user_id).update(
+        {models.StockReservation.expires_at: expires_at}, synchronize_session=False)
+
+
+def reserve_many(db, user_id: int, items):
+    """
+    Reserve quantity of every product if available stock covers it. Caller commits with the cart write.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    user_id: int - Owner of the cart
+    items: dict - Quantity to reserve for every product id
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: set - Product IDs reserved, quantities below 1 are never reserved
+    """
+    items = {product_id: quantity for product_id, quantity in items.items() if quantity > 0}
+    if not items:
+        return set()
+    table = models.Product.__table__
+    condition = table.c.quantity - table.c.reserved_quantity
+    if len(items) == 1:
+        (product_id, quantity), = items.items()
+        reserved = {product_id} if db.execute(update(table).where(
+            table.c.id == product_id, condition >= quantity).values(
+            reserved_quantity=table.c.reserved_quantity + quantity)).rowcount else set()
+    elif db.get_bind().dialect.name == 'postgresql':
+        lock_products(db, items)
+        rows = values(column('id', table.c.id.type), column('quantity', table.c.quantity.type),
+                      name='v').data(list(items.items()))
+        reserved = {product_id for product_id, in db.execute(update(table).where(
+            table.c.id == rows.c.id, condition >= rows.c.quantity).values(
+            reserved_quantity=table.c.reserved_quantity + rows.c.quantity).returning(table.c.id))}
+    else:
+        reserved = set()
+        for product_id in sorted(items):
+            if db.execute(update(table).where(table.c.id == product_id, condition >= items[product_id]).values(
+                    reserved_quantity=table.c.reserved_quantity + items[product_id])).rowcount:
+                reserved.add(product_id)
+    if reserved:
+        hold(db, user_id, {product_id: items[product_id] for product_id in reserved})
+    return reserved
+
+
+def reserve(db, user_id: int, product_id: int, quantity: int):
+    """Reserve quantity of one product. Returns False if available stock does not cover it."""
+    return product_id in reserve_many(db, user_id, {product_id: quantity})
+
+
+def release(db, user_id: int, product_id: int):
+    """Give reserved quantity of product in cart of user back to available stock."""
+    lock_products(db, [product_id])
+    reservation = db.query(models.StockReservation).filter(
+        models.StockReservation.user_id == user_id, models.StockReservation.product_id == product_id).first()
+    if reservation is None:
+        return
+    db.query(models.Product).filter(models.Product.id == product_id).update(
+        {models.Product.reserved_quantity: models.Product.reserved_quantity - reservation.quantity},
+        synchronize_session=False)
+    db.delete(reservation)
+
+
+def decrement(db, lines):
+    """
+    Decrease quantity and reserved quantity of every product with one conditional UPDATE. A line is applied
+    only when stock covers it: quantity never goes below zero and the part of the line not reserved must fit
+    in available stock.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    lines: list - (product id, quantity ordered, quantity reserved) of every product
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: list - Product IDs short of stock, nothing should be committed if not empty
+    """
+    table = models.Product.__table__
+    available = table.c.quantity - table.c.reserved_quantity
+    if db.get_bind().dialect.name == 'postgresql':
+        rows = values(column('id', table.c.id.type), column('quantity', table.c.quantity.type),
+                      column('reserved', table.c.reserved_quantity.type), name='v').data(lines)
+        updated = {product_id for product_id, in db.execute(update(table).where(
+            table.c.id == rows.c.id, table.c.quantity >= rows.c.quantity,
+            or_(rows.c.quantity <= rows.c.reserved, available >= rows.c.quantity - rows.c.reserved)).values(
+            quantity=table.c.quantity - rows.c.quantity,
+            reserved_quantity=table.c.reserved_quantity - rows.c.reserved).returning(table.c.id))}
+        return [product_id for product_id, quantity, reserved in lines if quantity and product_id not in updated]
+
+    stock = {row.id: row for row in db.query(
+        models.Product.id, models.Product.quantity, models.Product.available).filter(
+        models.Product.id.in_([product_id for product_id, quantity, reserved in lines]))}
+    short = [product_id for product_id, quantity, reserved in lines if quantity and (
+        product_id not in stock or stock[product_id].quantity < quantity or
+        (quantity > reserved and stock[product_id].available < quantity - reserved))]
+    if short:
+        return short
+    result = db.execute(update(table).where(
+        table.c.id == bindparam('b_id'), table.c.quantity >= bindparam('b_quantity'),
+        or_(bindparam('b_quantity') <= bindparam('b_reserved'),
+            available >= bindparam('b_quantity') - bindparam('b_reserved'))).values(
+        quantity=table.c.quantity - bindparam('b_quantity'),
+        reserved_quantity=table.c.reserved_quantity - bindparam('b_reserved')),
+        [{'b_id': product_id, 'b_quantity': quantity, 'b_reserved': reserved}
+         for product_id, quantity, reserved in lines if product_id in stock])
+    """Stock changed between the read and the update, whole order is refused"""
+    if result.rowcount != len(stock):
+        return [product_id for product_id, quantity, reserved in lines if quantity]
+    return []
+
+
+def convert(db, user_id: int, cart_items):
+    """
+    Turn reservations of user into stock decrements at checkout. Lines whose reservation expired take their
+    quantity from available stock instead. Caller commits with the order, any line short of stock raises
+    and the whole order is rolled back.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    user_id: int - Owner of the cart
+    cart_items: list - Cart lines being ordered
+    ----------------------------------------------------------
+    """
+    ordered = defaultdict(int)
+    names = {}
+    for item in cart_items:
+        ordered[item.product_id] += item.product_quantity
+        names[item.product_id] = item.product_name
+    reservations = db.query(models.StockReservation.product_id, models.StockReservation.quantity).filter(
+        models.StockReservation.user_id == user_id)
+    product_ids = sorted(set(ordered) | {product_id for product_id, quantity in reservations})
+    lock_products(db, product_ids)
+    """Read again under the locks, sweeper may have released some reservations meanwhile"""
+    held = dict(reservations.all())
+
+    short = decrement(db, [(product_id, ordered.get(product_id, 0), held.get(product_id, 0))
+                           for product_id in product_ids])
+    if short:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=messages.Insufficient_Stock_409([names[product_id] for product_id in short]))
+    db.query(models.StockReservation).filter(models.StockReservation.user_id == user_id).delete(
+        synchronize_session=False)
+
+
+def expire(db, batch_size: int):
+    """
+    Release reservations idle for longer than TTL, batch by batch, one transaction each.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    batch_size: int - Reservations released per transaction
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: int - Number of reservations released
+    """
+    released = 0
+    table = models.Product.__table__
+    while True:
+        candidates = db.query(models.StockReservation.id, models.StockReservation.product_id).filter(
+            models.StockReservation.expires_at < datetime.datetime.utcnow()).limit(batch_size).all()
+        if not candidates:
+            return released
+        lock_products(db, {product_id for reservation_id, product_id in candidates})
+        """Reservations extended while waiting for the locks are kept"""
+        rows = db.query(models.StockReservation.id, models.StockReservation.product_id,
+                        models.StockReservation.quantity).filter(
+            models.StockReservation.id.in_([reservation_id for reservation_id, product_id in candidates]),
+            models.StockReservation.expires_at < datetime.datetime.utcnow()).with_for_update().all()
+        totals = defaultdict(int)
+        for reservation_id, product_id, quantity in rows:
+            totals[product_id] += quantity
+        if totals:
+            db.execute(update(table).where(table.c.id == bindparam('b_id')).values(
+                reserved_quantity=table.c.reserved_quantity - bindparam('b_quantity')),
+                [{'b_id': product_id, 'b_quantity': quantity} for product_id, quantity in totals.items()])
+            db.query(models.StockReservation).filter(models.StockReservation.id.in_(
+                [reservation_id for reservation_id, product_id, quantity in rows])).delete(synchronize_session=False)
+        db.commit()
+        released += len(rows)
+        if len(candidates) < batch_size:
+            return released
@@ -0,0 +1,126 @@
+import datetime
+import os
+import threading
+import time
+from sqlalchemy import or_
+from dotenv import load_dotenv
+from .bloom_filter import BloomFilter
+from .. import models
+
+load_dotenv()
+
+"""
+Revoked Tokens. Revoked token ids (jti) are stored in revoked_tokens table and every worker mirrors them
+in an in-process Bloom filter. Checking a token is one filter lookup; database is queried only when filter
+says the token may be revoked, and to pull rows revoked by other workers once per interval.
+Ids are handed out at insert but rows become visible at commit, so a row may show up below ids seen already.
+Ids skipped below the highest id seen are remembered as gaps and looked up again by following refreshes
+until they show up or are older than REVOCATION_COMMIT_DELAY_SECONDS, by when a pending insert has committed
+or rolled back. With nothing newly revoked a refresh is one probe past the highest id seen.
+"""
+
+REVOCATION_CHECK_SECONDS = float(os.environ.get('REVOCATION_CHECK_SECONDS', 2))
+REVOCATION_FILTER_CAPACITY = int(os.environ.get('REVOCATION_FILTER_CAPACITY', 100000))
+REVOCATION_COMMIT_DELAY_SECONDS = float(os.environ.get('REVOCATION_COMMIT_DELAY_SECONDS', 60))
+REVOCATION_MAX_GAPS = int(os.environ.get('REVOCATION_MAX_GAPS', 1000))
+
+
+class RevocationList:
+    def __init__(self, check_interval: float, capacity: int, commit_delay: float = REVOCATION_COMMIT_DELAY_SECONDS,
+                 max_gaps: int = REVOCATION_MAX_GAPS):
+        self.check_interval = check_interval
+        self.capacity = capacity
+        self.commit_delay = commit_delay
+        self.max_gaps = max_gaps
+        self._filter = BloomFilter(capacity)
+        self._last_id = 0
+        self._gaps = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.positives = 0
+        self.false_positives = 0
+
+    def _refresh(self, db):
+        """
+        Add rows revoked since last refresh, and rows of gaps still open, to filter, rebuilding filter from live
+        rows once it is full. Gaps are ids skipped below the highest id seen, noted with the time they were
+        found and dropped after commit delay; at most max_gaps newest gaps are kept.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            rebuild = self._filter.is_full()
+            self._gaps = {gap: found for gap, found in self._gaps.items() if now - found < self.commit_delay}
+            last_id, gaps = self._last_id, list(self._gaps)
+
+        query = db.query(models.RevokedToken.id, models.RevokedToken.jti)
+        if rebuild:
+            query = query.filter(models.RevokedToken.expires_at > datetime.datetime.utcnow())
+        elif gaps:
+            query = query.filter(or_(models.RevokedToken.id > last_id, models.RevokedToken.id.in_(gaps)))
+        else:
+            query = query.filter(models.RevokedToken.id > last_id)
+        rows = query.all()
+
+        with self._lock:
+            if rebuild:
+                self._filter = BloomFilter(max(self.capacity, len(rows) * 2))
+            found = set()
+            for row_id, jti in rows:
+                """Another refresh may have added the row meanwhile, it is not counted twice"""
+                if rebuild or row_id > self._last_id or row_id in self._gaps:
+                    self._filter.add(jti)
+                self._gaps.pop(row_id, None)
+                found.add(row_id)
+            highest = max(found | {self._last_id})
+            for gap in range(max(self._last_id + 1, highest - self.max_gaps), highest):
+                if gap not in found:
+                    self._gaps[gap] = now
+            if len(self._gaps) > self.max_gaps:
+                for gap in sorted(self._gaps)[:len(self._gaps) - self.max_gaps]:
+                    del self._gaps[gap]
+            self._last_id = highest
+            self._checked_at = now
+
+    def is_revoked(self, db, jti: str):
+        """
+        Check whether token id is revoked.
+        Parameters
+        ----------------------------------------------------------
+        db: Database Object - Fetching Schemas Content
+        jti: str - Token ID claim
+        ----------------------------------------------------------
+
+        Returns
+        ----------------------------------------------------------
+        response: bool - True if token is revoked
+        """
+        self._refresh(db)
+        if jti not in self._filter:
+            return False
+        self.positives += 1
+        revoked = db.query(models.RevokedToken.id).filter(models.RevokedToken.jti == jti).first() is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def revoke(self, db, token_data):
+        """Store token id as revoked until token expiry. Caller commits."""
+        db.add(models.RevokedToken(jti=token_data.jti, user_id=token_data.user_id,
+                                   expires_at=datetime.datetime.utcfromtimestamp(token_data.expires_at)))
+        with self._lock:
+            self._filter.add(token_data.jti)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': self._filter.count,
+                'capacity': self._filter.capacity,
+                'positives': self.positives,
+                'false_positives': self.false_positives,
+                'open_gaps': len(self._gaps),
+            }
+
+
+revoked_tokens = RevocationList(REVOCATION_CHECK_SECONDS, REVOCATION_FILTER_CAPACITY)
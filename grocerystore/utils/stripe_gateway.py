@@ -1,46 +1,156 @@
+import functools
 import os
+import time
+import uuid
+import anyio
+from fastapi import HTTPException, status
 from dotenv import load_dotenv
 import stripe
+from ..repository import messages
+from .. import models
+from .dialect import dialect_insert
 
 load_dotenv()
 
-"""Generate Invoice for User Orders"""
+"""
+Generate Invoice for User Orders through a payment gateway selected with PAYMENT_GATEWAY=stripe|fake. A
+checkout needs one Stripe call, creating the Checkout Session, plus creating the Stripe Customer on first
+order of a user only. Customer ids are committed to stripe_customers table before any Checkout Session is
+created for them, so a checkout retried after a failure reuses the Customer instead of creating another.
+The fake gateway answers locally, for tests and benchmarks, after FAKE_GATEWAY_DELAY_SECONDS.
+Stripe SDK is blocking, so every call runs in worker threads of its own capacity limiter and the event loop
+keeps serving other requests while Stripe responds. Slow Stripe can use up at most STRIPE_CONCURRENCY
+threads, leaving threadpool of sync endpoints alone. Stripe client keeps its HTTP connections open between
+calls, gives up after STRIPE_TIMEOUT_SECONDS and retries failed calls with idempotency keys up to
+STRIPE_MAX_RETRIES times.
+"""
 
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'stripe')
+STRIPE_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_TIMEOUT_SECONDS', 10))
+STRIPE_MAX_RETRIES = int(os.environ.get('STRIPE_MAX_RETRIES', 2))
+STRIPE_CONCURRENCY = int(os.environ.get('STRIPE_CONCURRENCY', 20))
+FAKE_GATEWAY_DELAY_SECONDS = float(os.environ.get('FAKE_GATEWAY_DELAY_SECONDS', 0))
 
-def strip_payment_gateway(total_amount, email):
-    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-    invoice = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'inr',
-                        'product_data': {
-                            'name': 'cart',
-                        },
-                        'unit_amount': int(total_amount * 100),
+stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+stripe.max_network_retries = STRIPE_MAX_RETRIES
+stripe.default_http_client = stripe.http_client.RequestsClient(timeout=STRIPE_TIMEOUT_SECONDS)
+
+_limiter = None
+
+
+def limiter():
+    """Capacity limiter of Stripe calls, created on first use inside running event loop."""
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(STRIPE_CONCURRENCY)
+    return _limiter
+
+
+def stored_customer(db, user_id: int):
+    """Return Stripe Customer id kept for user, None before first order."""
+    row = db.query(models.StripeCustomer.customer_id).filter(models.StripeCustomer.user_id == user_id).first()
+    return row.customer_id if row else None
+
+
+def store_customer(db, user_id: int, customer_id: str):
+    """Keep and commit Stripe Customer id of user. First stored id wins and is returned."""
+    statement = dialect_insert(db)(models.StripeCustomer.__table__).values(user_id=user_id, customer_id=customer_id)
+    db.execute(statement.on_conflict_do_nothing(index_elements=['user_id']))
+    db.commit()
+    return stored_customer(db, user_id)
+
+
+class StripeGateway:
+    """Checkout Sessions and Customers created with Stripe API."""
+
+    def create_customer(self, email: str):
+        return stripe.Customer.create(email=email).id
+
+    def create_checkout(self, total_amount, customer_id: str):
+        return stripe.checkout.Session.create(
+            customer=customer_id,
+            payment_method_types=['card'],
+            line_items=[{
+                'price_data': {
+                    'currency': 'inr',
+                    'product_data': {
+                        'name': 'cart',
                     },
-                    'quantity': 1,
-                }],
-                mode='payment',
-                success_url=os.environ.get('HOST')+'/templates/success.html',
-                cancel_url=os.environ.get('HOST')+'/templates/cancel.html',
-            )
-    card_obj = stripe.PaymentMethod.create(
-        type="card",
-        card={
-            "number": "4242424242424242",
-            "exp_month": 7,
-            "exp_year": 2023,
-            "cvc": "123",
-        },
-    )
-    customer = stripe.Customer.create(
-        email=email, payment_method=card_obj.id
-    )
-    stripe.PaymentIntent.create(
-        customer=customer.id,
-        payment_method=card_obj.id,
-        currency="inr",
-        amount=int(total_amount * 100),
-    )
-    return invoice
+                    'unit_amount': int(total_amount * 100),
+                },
+                'quantity': 1,
+            }],
+            mode='payment',
+            success_url=os.environ.get('HOST')+'/templates/success.html',
+            cancel_url=os.environ.get('HOST')+'/templates/cancel.html',
+        )
+
+
+class FakeGateway:
+    """Local stand-in of Stripe returning invoices of the same shape, nothing is charged."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+
+    def create_customer(self, email: str):
+        return f'cus_fake_{uuid.uuid4().hex}'
+
+    def create_checkout(self, total_amount, customer_id: str):
+        if self.delay:
+            time.sleep(self.delay)
+        return {
+            'id': f'cs_fake_{uuid.uuid4().hex}',
+            'payment_intent': f'pi_fake_{uuid.uuid4().hex}',
+            'payment_status': 'unpaid',
+            'customer': customer_id,
+            'amount_total': int(total_amount * 100),
+            'url': (os.environ.get('HOST') or '') + '/templates/success.html',
+        }
+
+
+def build_gateway(name: str = PAYMENT_GATEWAY):
+    if name == 'fake':
+        return FakeGateway(FAKE_GATEWAY_DELAY_SECONDS)
+    return StripeGateway()
+
+
+gateway = build_gateway()
+
+
+async def call_gateway(fn, *args):
+    """Run call of payment gateway in worker thread of Stripe limiter, Stripe failures answer 502."""
+    try:
+        return await anyio.to_thread.run_sync(functools.partial(fn, *args), limiter=limiter())
+    except stripe.error.StripeError:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=messages.PAYMENT_GATEWAY_502)
+
+
+async def create_customer(email):
+    """
+    Create Stripe Customer of User without blocking event loop. Caller stores it before using it.
+    Parameters
+    ----------------------------------------------------------
+    email: str - Email of User paying
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: str - Stripe Customer id
+    """
+    return await call_gateway(gateway.create_customer, email)
+
+
+async def payment_gateway(total_amount, customer_id):
+    """
+    Generate Invoice without blocking event loop.
+    Parameters
+    ----------------------------------------------------------
+    total_amount: float - Amount payable by User
+    customer_id: str - Stripe Customer id stored for User
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: dict - Checkout Session of the order
+    """
+    return await call_gateway(gateway.create_checkout, total_amount, customer_id)
@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+import logging
+import os
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from .. import models, database
+from . import reservations
+
+load_dotenv()
+
+"""
+Periodic cleanup of expired rows. Every worker runs the sweeper in background, deletes are idempotent so
+workers sweeping at the same time do no harm. Rows are deleted in small batches, one transaction each, so
+sweeping never holds long locks on tables serving requests.
+"""
+
+SWEEP_INTERVAL_SECONDS = float(os.environ.get('SWEEP_INTERVAL_SECONDS', 60))
+SWEEP_BATCH_SIZE = int(os.environ.get('SWEEP_BATCH_SIZE', 1000))
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired(db, model, expiry_column, batch_size: int = SWEEP_BATCH_SIZE):
+    """
+    Delete rows whose expiry time has passed, batch by batch.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    model: Model Class - Table to clean up
+    expiry_column: Column - Expiry timestamp column of the table
+    batch_size: int - Rows deleted per transaction
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: int - Number of rows deleted
+    """
+    deleted = 0
+    while True:
+        ids = [row_id for row_id, in db.query(model.id).filter(
+            expiry_column < datetime.datetime.utcnow()).limit(batch_size)]
+        if not ids:
+            return deleted
+        deleted += db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        if len(ids) < batch_size:
+            return deleted
+
+
+def purge_reset_codes(db):
+    return purge_expired(db, models.ResetCode, models.ResetCode.expired_in)
+
+
+def purge_revoked_tokens(db):
+    return purge_expired(db, models.RevokedToken, models.RevokedToken.expires_at)
+
+
+def release_reservations(db):
+    return reservations.expire(db, SWEEP_BATCH_SIZE)
+
+
+JOBS = [purge_reset_codes, purge_revoked_tokens, release_reservations]
+
+
+def sweep():
+    """Run every cleanup job once, a failing job does not stop the others."""
+    results = {}
+    db = database.SessionLocal()
+    try:
+        for job in JOBS:
+            try:
+                results[job.__name__] = job(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Sweeper job %s failed", job.__name__)
+    finally:
+        db.close()
+    return results
+
+
+async def run_forever(interval: float = SWEEP_INTERVAL_SECONDS):
+    """Sweep once per interval until cancelled."""
+    while True:
+        await run_in_threadpool(sweep)
+        await asyncio.sleep(interval)
+
+
+class Sweeper:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        """Start sweeping in background of running event loop, interval of 0 disables sweeper."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(run_forever(self.interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+sweeper = Sweeper(SWEEP_INTERVAL_SECONDS)
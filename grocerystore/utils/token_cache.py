@@ -0,0 +1,66 @@
+import hashlib
+import os
+from .lru_cache import LRUCache
+from .. import models
+
+"""
+Cache of verified JWT claims. Hot clients send the same token on every request, so signature check and
+claims parsing are done once per token and reused until token expiry. Keys are sha256 digests so raw
+tokens are never kept in memory of the cache.
+Current token version of every user is cached apart for TOKEN_VERSION_CHECK_SECONDS, so access tokens issued
+before a password reset or role change stop working within that time instead of at their expiry.
+"""
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_VERSION_CHECK_SECONDS = float(os.environ.get('TOKEN_VERSION_CHECK_SECONDS', 30))
+
+
+class TokenCache:
+    def __init__(self, max_size: int):
+        self._cache = LRUCache(max_size)
+
+    @staticmethod
+    def _key(kind: str, token: str):
+        return kind, hashlib.sha256(token.encode()).digest()
+
+    def get(self, kind: str, token: str):
+        """Return cached TokenData of token, None if token was not verified before or is expired."""
+        return self._cache.get(self._key(kind, token))
+
+    def set(self, kind: str, token: str, token_data, expires_at):
+        """Keep verified TokenData until expires_at (epoch seconds), which is exp claim of the token."""
+        if expires_at is None:
+            return
+        self._cache.set(self._key(kind, token), token_data, expires_at=expires_at)
+
+    def flush(self):
+        """Forget every verified token, e.g. after secret keys are rotated."""
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class TokenVersions:
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = LRUCache(max_size, ttl)
+
+    def current(self, db, user_id: int):
+        """Return token version of user, read from database at most once per ttl. Deleted users get -1."""
+        version = self._cache.get(user_id)
+        if version is None:
+            row = db.query(models.User.token_version).filter(models.User.id == user_id).first()
+            version = -1 if row is None else row.token_version or 0
+            self._cache.set(user_id, version)
+        return version
+
+    def forget(self, user_id: int):
+        """Drop cached version of user whose tokens were just invalidated by this worker."""
+        self._cache.pop(user_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+verified_tokens = TokenCache(TOKEN_CACHE_SIZE)
+token_versions = TokenVersions(TOKEN_CACHE_SIZE, TOKEN_VERSION_CHECK_SECONDS)
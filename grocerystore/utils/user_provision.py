@@ -0,0 +1,64 @@
+import re
+from sqlalchemy import insert
+from ..repository import messages
+from ..repository.authentication import ADMIN_EMAIL, EMAIL_PATTERN, PASSWORD_PATTERN
+from .. import models
+
+"""
+Bulk Provisioning of Users. Rows are validated up front, existing emails are looked up once per chunk and
+every chunk of users is written with multi-row inserts of users and their wallets in one transaction.
+"""
+
+
+def validate_users(users):
+    """
+    Validate email/password format of every row and drop repeated emails within request.
+    Parameters
+    ----------------------------------------------------------
+    users: list - User schema objects in request order
+    ----------------------------------------------------------
+
+    Returns
+    ----------------------------------------------------------
+    response: tuple - list of (row number, user) to provision, dict of row number to outcome of rejected rows
+    """
+    valid, results, seen = [], {}, set()
+    for number, user in enumerate(users):
+        error = None
+        if not re.fullmatch(EMAIL_PATTERN, user.email):
+            error = messages.INVALID_EMAIL_401
+        elif not re.fullmatch(PASSWORD_PATTERN, user.password):
+            error = messages.PASSWORD_FORMAT_401
+        if error:
+            results[number] = {'row': number, 'email': user.email, 'status': 'invalid', 'error': error}
+        elif user.email in seen:
+            results[number] = {'row': number, 'email': user.email, 'status': 'duplicate'}
+        else:
+            seen.add(user.email)
+            valid.append((number, user))
+    return valid, results
+
+
+def existing_emails(db, emails):
+    """Return the emails of chunk that are registered already."""
+    return {email for email, in db.query(models.User.email).filter(models.User.email.in_(emails))}
+
+
+def insert_users(db, rows):
+    """
+    Insert users and their wallets with one multi-row insert each. ADMIN_EMAIL becomes admin, as with
+    registration. Caller commits.
+    Parameters
+    ----------------------------------------------------------
+    db: Database Object - Fetching Schemas Content
+    rows: list - (user, hashed password) tuples
+    ----------------------------------------------------------
+    """
+    db.execute(insert(models.User.__table__).values([
+        {'username': user.username, 'email': user.email, 'password': password, 'is_admin': user.email == ADMIN_EMAIL,
+         'token_version': 0}
+        for user, password in rows]))
+    emails = [user.email for user, password in rows]
+    user_ids = [user_id for user_id, in db.query(models.User.id).filter(models.User.email.in_(emails))]
+    db.execute(insert(models.MyWallet.__table__).values([
+        {'user_id': user_id, 'acc_balance': 0} for user_id in user_ids]))
@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+"""
+Tests run the app against a fresh SQLite file with the fake payment gateway, environment is set before
+grocerystore is imported since its modules read configuration on import.
+"""
+
+os.environ['DB_URL'] = 'sqlite:///{}?check_same_thread=false'.format(
+    os.path.join(tempfile.mkdtemp(), 'grocerystore.db'))
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('JWT_REFRESH_SECRET_KEY', 'test-refresh-secret-key')
+os.environ['ADMIN_EMAIL'] = 'admin@admin.in'
+os.environ['CART_BACKEND'] = 'sql'
+os.environ['PAYMENT_GATEWAY'] = 'fake'
+os.environ['FAKE_GATEWAY_DELAY_SECONDS'] = '0.05'
+os.environ.setdefault('HOST', 'http://testserver')
+
+import itertools
+import pytest
+from fastapi.testclient import TestClient
+from grocerystore import database, models
+from grocerystore.main import app
+
+database.engine.echo = False
+
+PASSWORD = 'Passw0rd@1'
+_emails = itertools.count()
+
+
+@pytest.fixture(scope='session')
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def login(client, email):
+    """Register User with email and return its authorization headers."""
+    response = client.post('/register', json=dict(username=email.split('@')[0], email=email, password=PASSWORD,
+                                                  confirm_password=PASSWORD))
+    assert response.status_code == 200, response.text
+    response = client.post('/login', json=dict(username=email, password=PASSWORD))
+    assert response.status_code == 200, response.text
+    return {'Authorization': 'Bearer ' + response.json()['access_token']}
+
+
+@pytest.fixture(scope='session')
+def admin(client):
+    return login(client, 'admin@admin.in')
+
+
+@pytest.fixture
+def new_user(client):
+    """Register a fresh User, returns its authorization headers."""
+    return lambda: login(client, f'user{next(_emails)}@mail.com')
+
+
+@pytest.fixture
+def new_product(db):
+    """Create a Product directly in database, returns its id."""
+    def create(price=10.0, quantity=5, product_type='fruit'):
+        number = next(_emails)
+        product = models.Product(title=f'Product {number}', description=f'Product {number}',
+                                 product_type=product_type, price=price, quantity=quantity)
+        db.add(product)
+        db.commit()
+        return product.id
+    return create
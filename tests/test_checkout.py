@@ -0,0 +1,82 @@
+import asyncio
+import datetime
+import httpx
+from grocerystore import models
+from grocerystore.main import app
+from grocerystore.repository import messages
+from grocerystore.utils import reservations
+
+CHECKOUTS = 12
+STOCK = 5
+
+
+def fill_cart(client, headers, product_id, quantity=1):
+    response = client.post('/user/add_to_cart', json=dict(item_id=product_id, item_quantity=quantity),
+                           headers=headers)
+    assert response.status_code == 200, response.text
+    response = client.post('/user/shipping_info', json=dict(name='n', phone_no='1234567890', address='a', city='c',
+                                                            state='s'), headers=headers)
+    assert response.status_code == 200, response.text
+    return client.get('/user/show_shipping_info', headers=headers).json()[-1]['id']
+
+
+async def checkout_all(users):
+    async with httpx.AsyncClient(app=app, base_url='http://testserver') as async_client:
+        return await asyncio.gather(*[
+            async_client.post('/user/order_payment', json=dict(shipping_id=shipping_id, coupon_code=''),
+                              headers=headers) for headers, shipping_id in users])
+
+
+def test_parallel_checkouts_never_oversell(client, db, new_user, new_product):
+    """Carts hold more than stock once their reservations expire, checkouts then race for the stock left."""
+    product_id = new_product(price=120.0, quantity=CHECKOUTS)
+    users = []
+    for _ in range(CHECKOUTS):
+        headers = new_user()
+        users.append((headers, fill_cart(client, headers, product_id)))
+
+    db.query(models.Product).filter(models.Product.id == product_id).update({models.Product.quantity: STOCK})
+    db.query(models.StockReservation).update(
+        {models.StockReservation.expires_at: datetime.datetime.utcnow() - datetime.timedelta(minutes=1)})
+    db.commit()
+    assert reservations.expire(db, 100) == CHECKOUTS
+
+    responses = asyncio.run(checkout_all(users))
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] * STOCK + [409] * (CHECKOUTS - STOCK), [response.text for response in responses]
+
+    db.expire_all()
+    product = db.query(models.Product).get(product_id)
+    assert product.quantity == 0 and product.reserved_quantity == 0
+    assert db.query(models.OrderDetails).filter(
+        models.OrderDetails.product_name == product.title).count() == STOCK
+    assert db.query(models.CheckoutLock).count() == 0
+
+
+def test_parallel_checkouts_of_reserved_carts_all_succeed(client, db, new_user, new_product):
+    product_id = new_product(price=120.0, quantity=CHECKOUTS)
+    users = []
+    for _ in range(CHECKOUTS):
+        headers = new_user()
+        users.append((headers, fill_cart(client, headers, product_id)))
+    assert client.post('/user/add_to_cart', json=dict(item_id=product_id, item_quantity=1),
+                       headers=new_user()).status_code == 404
+
+    responses = asyncio.run(checkout_all(users))
+    assert all(response.status_code == 200 for response in responses), [response.text for response in responses]
+
+    db.expire_all()
+    product = db.query(models.Product).get(product_id)
+    assert product.quantity == 0 and product.reserved_quantity == 0
+
+
+def test_second_checkout_of_same_user_is_refused(client, db, new_user, new_product):
+    headers = new_user()
+    shipping_id = fill_cart(client, headers, new_product(price=120.0), quantity=2)
+
+    responses = asyncio.run(checkout_all([(headers, shipping_id)] * 2))
+    assert sorted(response.status_code for response in responses) == [200, 409]
+    assert messages.CHECKOUT_IN_PROGRESS_409 in [response.json().get('detail') for response in responses]
+
+    user_id = client.get('/user/view_balance', headers=headers).json()['user_id']
+    assert db.query(models.OrderDetails).filter(models.OrderDetails.user_id == user_id).count() == 1
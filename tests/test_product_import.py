@@ -0,0 +1,47 @@
+import json
+from unittest import mock
+from sqlalchemy.exc import DataError
+from grocerystore import models
+from grocerystore.repository import admin as admin_repository, messages
+from grocerystore.utils import product_import
+
+executemany_batch = product_import.executemany_batch
+
+
+def refuse_bad_titles(db, rows, on_conflict):
+    """Stand-in for a database refusing values, like a title longer than its column on Postgres"""
+    if any(row['title'] == 'too long' for number, row in rows):
+        raise DataError('INSERT INTO products', {}, Exception('value too long for type character varying(255)'))
+    return executemany_batch(db, rows, on_conflict)
+
+
+def import_rows(client, admin, rows):
+    body = '\n'.join(json.dumps(row) for row in rows).encode()
+    response = client.post('/admin/import_items', data=body, headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rows_refused_by_database_are_reported_and_others_saved(client, db, admin):
+    rows = [dict(title='fine', description=f'import-fine-{number}', price=10, quantity=1) for number in range(4)]
+    rows[1]['title'] = rows[3]['title'] = 'too long'
+
+    with mock.patch.object(product_import, 'executemany_batch', side_effect=refuse_bad_titles):
+        report = import_rows(client, admin, rows)
+
+    assert report['inserted'] == 2 and report['errors_omitted'] == 0
+    assert [error['row'] for error in report['errors']] == [2, 4]
+    assert report['errors'][0]['error'] == messages.Row_Rejected(DataError('', {}, Exception(
+        'value too long for type character varying(255)')))
+    saved = {description for description, in db.query(models.Product.description).filter(
+        models.Product.description.like('import-fine-%'))}
+    assert saved == {'import-fine-0', 'import-fine-2'}
+
+
+def test_row_errors_are_capped(client, admin):
+    rows = [dict(title='no price', description=f'import-bad-{number}') for number in range(7)]
+
+    with mock.patch.object(admin_repository, 'MAX_IMPORT_ERRORS', 5):
+        report = import_rows(client, admin, rows)
+
+    assert len(report['errors']) == 5 and report['errors_omitted'] == 2
@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import pathlib
+import random
+import time
+import pytest
+from sqlalchemy import create_engine, desc, insert
+from sqlalchemy.orm import sessionmaker
+
+"""
+Plans of the order queries indexed by migration d7a3e5b19f60, checked on a seeded SQLite database. Run
+python -m tests.test_query_plans to print timings of every query with and without its index.
+"""
+
+os.environ.setdefault('DB_URL', 'sqlite://')
+from grocerystore import models  # noqa: E402
+
+MIGRATION = pathlib.Path(__file__).parents[1] / 'grocerystore' / 'migrations' / 'versions' / \
+    'd7a3e5b19f60_hot_filter_indexes.py'
+SEED_ORDERS = 20000
+STATUSES = ['received', 'packed', 'shipped', 'delivered', 'returned']
+
+# (name, query built like repository does, index expected in plan)
+QUERIES = [
+    ('history', lambda db: db.query(models.OrderDetails).filter(models.OrderDetails.user_id == 777).order_by(
+        desc(models.OrderDetails.id)), 'ix_order_details_user_id_id'),
+    ('webhook', lambda db: db.query(models.OrderDetails).filter(models.OrderDetails.payment_id == 'pi_4242'),
+     'ix_order_details_payment_id'),
+    ('track', lambda db: db.query(models.OrderDetails).filter(models.OrderDetails.description == 'cs_4242'),
+     'ix_order_details_description'),
+]
+
+
+def seeded_session(orders: int):
+    """In-memory database with tables and indexes of models and orders spread over many users."""
+    engine = create_engine('sqlite://')
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(models.OrderDetails.__table__), [
+            {'id': order_id, 'user_id': random.randint(1, orders // 25), 'description': f'cs_{order_id // 3}',
+             'payment_id': f'pi_{order_id // 3}', 'product_name': 'p', 'total_amount': 10.0,
+             'order_status': random.choice(STATUSES)} for order_id in range(1, orders + 1)])
+    return sessionmaker(bind=engine)()
+
+
+def plan(db, query, label: str = ''):
+    """Plan of query, label keeps statement cache of driver from answering with a plan made before DDL."""
+    statement = query.statement.compile(db.get_bind(), compile_kwargs={'literal_binds': True})
+    return ' '.join(row[3] for row in db.execute(f'EXPLAIN QUERY PLAN {statement} -- {label}'))
+
+
+def migration_indexes():
+    spec = importlib.util.spec_from_file_location('hot_filter_indexes', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.INDEXES
+
+
+@pytest.fixture(scope='module')
+def seeded():
+    db = seeded_session(SEED_ORDERS)
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize('name, build, index', QUERIES)
+def test_order_queries_search_their_index(seeded, name, build, index):
+    query_plan = plan(seeded, build(seeded))
+    assert query_plan.startswith('SEARCH') and index in query_plan, query_plan
+
+
+def test_migration_indexes_are_declared_in_models():
+    declared = {index.name: (index.table.name, [column.name for column in index.columns])
+                for table in models.Base.metadata.tables.values() for index in table.indexes}
+    for name, table, columns in migration_indexes():
+        assert declared.get(name) == (table, columns), name
+
+
+def benchmark(orders: int = 500000, runs: int = 50):
+    """Print average time and plan of every query with its index and after dropping it."""
+    db = seeded_session(orders)
+    for dropped in (False, True):
+        print('without indexes' if dropped else 'with indexes')
+        for name, build, index in QUERIES:
+            if dropped:
+                db.execute(f'DROP INDEX IF EXISTS {index}')
+            query = build(db)
+            started = time.perf_counter()
+            for _ in range(runs):
+                query.all()
+            print(f'  {name:8} {(time.perf_counter() - started) / runs * 1000:8.3f} ms  {plan(db, query, str(dropped))}')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,140 @@
+from unittest import mock
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from grocerystore import models
+from grocerystore.utils import cart_store
+
+
+@pytest.fixture
+def store():
+    return cart_store.RedisCartStore(fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def user_id(client, new_user):
+    return client.get('/user/view_balance', headers=new_user()).json()['user_id']
+
+
+def lines(store, db, user_id):
+    return {line.product_id: (line.product_quantity, line.total) for line in store.items(db, user_id)}
+
+
+def reserved(db, product_id):
+    db.expire_all()
+    return db.query(models.Product.reserved_quantity).filter(models.Product.id == product_id).scalar()
+
+
+def test_add_increments_line_summary_and_reservation(store, db, user_id, new_product):
+    apple = new_product(price=10.0, quantity=5, product_type='fruit')
+    carrot = new_product(price=2.5, quantity=5, product_type='veg')
+
+    assert store.add(db, user_id, apple, 2) is False
+    store.commit(db)
+    assert store.add(db, user_id, apple, 1) is True
+    assert store.add(db, user_id, carrot, 4) is False
+    store.commit(db)
+
+    assert lines(store, db, user_id) == {apple: (3, 30.0), carrot: (4, 10.0)}
+    assert [line.product_id for line in store.items(db, user_id)] == [apple, carrot]
+    summary = store.summary(db, user_id)
+    assert (summary.item_count, summary.line_count, summary.subtotal) == (7, 2, 40.0)
+    assert summary.product_types == {'fruit': 30.0, 'veg': 10.0}
+    assert reserved(db, apple) == 3 and reserved(db, carrot) == 4
+
+
+def test_cart_is_untouched_when_reservation_commit_fails(store, db, user_id, new_product):
+    apple = new_product(price=10.0)
+    carrot = new_product(price=2.0)
+
+    store.add(db, user_id, apple, 2)
+    store.add_many(db, user_id, {carrot: 1})
+    with mock.patch.object(db, 'commit', side_effect=OperationalError('COMMIT', {}, Exception('disk I/O error'))):
+        with pytest.raises(OperationalError):
+            store.commit(db)
+    db.rollback()
+
+    assert lines(store, db, user_id) == {}
+    assert store.summary(db, user_id).item_count == 0
+    assert reserved(db, apple) == 0 and reserved(db, carrot) == 0
+
+    """Writes of the failed transaction are dropped, not applied by the next commit"""
+    store.add(db, user_id, carrot, 1)
+    store.commit(db)
+    assert lines(store, db, user_id) == {carrot: (1, 2.0)}
+
+
+def test_add_beyond_available_stock_is_refused(store, db, user_id, new_product):
+    apple = new_product(quantity=2)
+
+    with pytest.raises(HTTPException) as error:
+        store.add(db, user_id, apple, 3)
+    store.commit(db)
+
+    assert error.value.status_code == 404
+    assert lines(store, db, user_id) == {}
+    assert store.summary(db, user_id).item_count == 0 and reserved(db, apple) == 0
+
+
+def test_add_many_reports_every_item(store, db, user_id, new_product):
+    apple = new_product(price=10.0, quantity=5)
+    carrot = new_product(price=2.0, quantity=1, product_type='veg')
+    store.add(db, user_id, apple, 1)
+    store.commit(db)
+
+    results = store.add_many(db, user_id, {apple: 2, carrot: 3, 999999: 1, new_product(): 0})
+    store.commit(db)
+
+    assert list(results.values()) == ['updated', 'stock_unavailable', 'not_found', 'invalid_quantity']
+    assert lines(store, db, user_id) == {apple: (3, 30.0)}
+    summary = store.summary(db, user_id)
+    assert (summary.item_count, summary.line_count, summary.subtotal) == (3, 1, 30.0)
+    assert reserved(db, apple) == 3 and reserved(db, carrot) == 0
+
+
+def test_remove_takes_line_out_of_summary_and_releases_stock(store, db, user_id, new_product):
+    apple = new_product(price=10.0)
+    carrot = new_product(price=2.0, product_type='veg')
+    store.add_many(db, user_id, {apple: 2, carrot: 1})
+    store.commit(db)
+
+    assert store.remove(db, user_id, apple) is True
+    assert store.remove(db, user_id, apple) is False
+    store.commit(db)
+
+    assert lines(store, db, user_id) == {carrot: (1, 2.0)}
+    summary = store.summary(db, user_id)
+    assert (summary.item_count, summary.line_count, summary.subtotal) == (1, 1, 2.0)
+    assert summary.product_types == {'veg': 2.0}
+    assert reserved(db, apple) == 0
+
+
+def test_clear_without_lines_empties_cart(store, db, user_id, new_product):
+    store.add_many(db, user_id, {new_product(): 1, new_product(): 2})
+    store.commit(db)
+
+    store.clear(db, user_id)
+
+    assert lines(store, db, user_id) == {}
+    summary = store.summary(db, user_id)
+    assert (summary.item_count, summary.line_count, summary.subtotal) == (0, 0, 0.0)
+
+
+def test_clear_of_ordered_lines_keeps_items_added_meanwhile(store, db, user_id, new_product):
+    apple = new_product(price=10.0)
+    carrot = new_product(price=2.0, product_type='veg')
+    pear = new_product(price=4.0)
+    store.add_many(db, user_id, {apple: 2, carrot: 1})
+    store.commit(db)
+    ordered = store.items(db, user_id)
+    store.add(db, user_id, apple, 1)
+    store.add(db, user_id, pear, 1)
+    store.commit(db)
+
+    store.clear(db, user_id, ordered)
+
+    assert lines(store, db, user_id) == {apple: (1, 10.0), pear: (1, 4.0)}
+    summary = store.summary(db, user_id)
+    assert (summary.item_count, summary.line_count, summary.subtotal) == (2, 2, 14.0)
+    assert summary.product_types == {'fruit': 14.0}
@@ -0,0 +1,18 @@
+from unittest import mock
+from grocerystore import models
+from grocerystore.utils import user_provision
+from conftest import PASSWORD
+
+
+def test_admin_email_is_provisioned_as_admin(client, db, admin):
+    rows = [dict(username='boss', email='boss@grocery.in', password=PASSWORD),
+            dict(username='clerk', email='clerk@grocery.in', password=PASSWORD)]
+
+    with mock.patch.object(user_provision, 'ADMIN_EMAIL', 'boss@grocery.in'):
+        response = client.post('/admin/provision_users', json=rows, headers=admin)
+
+    assert response.status_code == 200, response.text
+    assert [row['status'] for row in response.json()] == ['created', 'created']
+    is_admin = dict(db.query(models.User.email, models.User.is_admin).filter(
+        models.User.email.in_(['boss@grocery.in', 'clerk@grocery.in'])))
+    assert is_admin == {'boss@grocery.in': True, 'clerk@grocery.in': False}